@@ -1,15 +1,28 @@
+import logging
 from PyQt6.QtWidgets import QGraphicsScene, QGraphicsPolygonItem, QPushButton, QGraphicsRectItem, QGraphicsView
 from PyQt6.QtGui import QPen, QColor, QPainterPath, QBrush, QPainter, QImage, QPolygonF
-from PyQt6.QtCore import Qt, QTimer, QPointF, pyqtSignal, QRectF
+from PyQt6.QtCore import Qt, QTimer, QPointF, pyqtSignal, QRectF, QVariantAnimation
 from viewer_mode import ViewerMode
 import numpy as np
 from scipy import ndimage
 import cv2
 from shapely.geometry import Polygon as ShapelyPolygon, Point, LineString
 from shapely.ops import unary_union
+import shapely
 from artifact_polygon_item import ArtifactPolygonItem
 from editable_polygon_item import EditablePolygonItem, NodeHandle, TangentHandle
 
+logger = logging.getLogger(__name__)
+
+# Upper bound on the number of prompt points extracted from a paint stroke
+PAINT_MAX_POINTS = 1000
+# Mouse moves within this many milliseconds are coalesced into one preview request
+PREVIEW_DEBOUNCE_MS = 30
+# Eraser moves shorter than this fraction of the brush size (at least 1 px) are dropped
+ERASER_MIN_STEP_FRACTION = 0.25
+# Douglas-Peucker tolerance, in pixels, applied to the eraser path before buffering
+ERASER_SIMPLIFY_TOLERANCE = 0.5
+
 class ArtifactGraphicsScene(QGraphicsScene):
     attribute_changed = pyqtSignal()  # Signal emitted when a polygon's attribute changes
 
@@ -21,6 +34,10 @@ class ArtifactGraphicsScene(QGraphicsScene):
         self.eraser_item = None
         self.current_erasing_polygon = None  # Track which polygon we're currently erasing
         self.eraser_points = []  # Store eraser path points
+        # Coordinates of eraser_points as an (N, 2) array, grown by doubling during a stroke
+        self.eraser_points_buffer = np.empty((64, 2), dtype=np.float64)
+        self.eraser_points_count = 0
+        self.eraser_points_source = None  # The eraser_points list the buffer mirrors
         self.test_mode = False  # Flag for test mode
         # Free-hand drawing state
         self.freehand_points = []  # Store free-hand drawing points
@@ -30,6 +47,15 @@ class ArtifactGraphicsScene(QGraphicsScene):
         self.editable_polygons = {}  # Map: ArtifactPolygonItem -> EditablePolygonItem
         self.selection_rect_item = None  # Rectangle for multi-selection
         self.selection_start_pos = None
+        # Point mode preview state: only the latest hover position is sent once the timer fires
+        self.pending_preview_pos = None
+        self.preview_timer = QTimer()
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.timeout.connect(self.emit_preview_request)
+        self.fade_animations = set()  # Running fade-out animations
+        self.rng = np.random.default_rng()  # Random generator for prompt point sampling
+        # Left-button mouse handlers for the current mode, see update_mouse_handlers
+        self.update_mouse_handlers()
 
     # Define signals for segmentation requests
     segmentation_validation_requested = pyqtSignal()
@@ -40,20 +66,35 @@ class ArtifactGraphicsScene(QGraphicsScene):
     erasing_complete = pyqtSignal(list, list, list, list)  # (original_items, new_items, original_data, new_data) for undo/redo
     polygon_shape_changed_for_undo = pyqtSignal(object, object, object)  # (editable_item, old_polygon, new_polygon) for undo/redo  # Signal for direct polygon creation from free-hand drawing
 
+    def update_mouse_handlers(self):
+        """Select the left-button handlers for the current mode so mouse events need a single lookup."""
+        mode = self.current_mode
+        self.press_handler = {
+            ViewerMode.BRUSH: self.start_painting,
+            ViewerMode.ERASER: self.start_erasing,
+            ViewerMode.FREEHAND: self.start_freehand_drawing,
+        }.get(mode)
+        self.move_handler = {
+            ViewerMode.BRUSH: self.paint,
+            ViewerMode.ERASER: self.erase,
+            ViewerMode.FREEHAND: self.continue_freehand_drawing,
+        }.get(mode)
+        self.release_handler = {
+            ViewerMode.BRUSH: self.finish_painting,
+            ViewerMode.ERASER: self.stop_erasing,
+            ViewerMode.FREEHAND: self.finish_freehand_drawing,
+            ViewerMode.EDIT: self.handle_edit_mode_release,
+        }.get(mode)
+
     def mousePressEvent(self, event):
-        if self.current_mode == ViewerMode.BRUSH and event.button() == Qt.MouseButton.LeftButton:
-            self.start_painting(event.scenePos())
+        handler = self.press_handler
+        if handler is not None and event.button() == Qt.MouseButton.LeftButton:
+            handler(event.scenePos())
             return  # Don't propagate event to allow selection
         elif self.current_mode == ViewerMode.POINT and event.button() == Qt.MouseButton.LeftButton:
             # Emit signal for segmentation validation
             self.segmentation_validation_requested.emit()
             return  # Don't propagate event to allow selection
-        elif self.current_mode == ViewerMode.ERASER and event.button() == Qt.MouseButton.LeftButton:
-            self.start_erasing(event.scenePos())
-            return
-        elif self.current_mode == ViewerMode.FREEHAND and event.button() == Qt.MouseButton.LeftButton:
-            self.start_freehand_drawing(event.scenePos())
-            return
         elif self.current_mode == ViewerMode.EDIT and event.button() == Qt.MouseButton.LeftButton:
             # First, let the event propagate to child items (handles)
             # This allows handles to receive and process the event
@@ -122,15 +163,14 @@ class ArtifactGraphicsScene(QGraphicsScene):
         super().mousePressEvent(event)
 
     def mouseMoveEvent(self, event):
-        if self.current_mode == ViewerMode.BRUSH and event.buttons() & Qt.MouseButton.LeftButton:
-            self.paint(event.scenePos())
+        handler = self.move_handler
+        if handler is not None and event.buttons() & Qt.MouseButton.LeftButton:
+            handler(event.scenePos())
         elif self.current_mode == ViewerMode.POINT and event.buttons() == Qt.MouseButton.NoButton:
-            # Emit signal for segmentation request
-            self.segmentation_preview_requested.emit(event.scenePos())
-        elif self.current_mode == ViewerMode.ERASER and event.buttons() & Qt.MouseButton.LeftButton:
-            self.erase(event.scenePos())
-        elif self.current_mode == ViewerMode.FREEHAND and event.buttons() & Qt.MouseButton.LeftButton:
-            self.continue_freehand_drawing(event.scenePos())
+            # Schedule a segmentation preview for the latest hover position
+            self.pending_preview_pos = event.scenePos()
+            if not self.preview_timer.isActive():
+                self.preview_timer.start(PREVIEW_DEBOUNCE_MS)
         elif self.current_mode == ViewerMode.EDIT and event.buttons() & Qt.MouseButton.LeftButton:
             # Only handle drag for selection rectangle if we started a selection
             if self.selection_start_pos is not None:
@@ -142,15 +182,9 @@ class ArtifactGraphicsScene(QGraphicsScene):
         super().mouseMoveEvent(event)
 
     def mouseReleaseEvent(self, event):
-        if self.current_mode == ViewerMode.BRUSH and event.button() == Qt.MouseButton.LeftButton:
-            self.add_shape_from_paint_path()
-            self.stop_painting()
-        elif self.current_mode == ViewerMode.ERASER and event.button() == Qt.MouseButton.LeftButton:
-            self.stop_erasing()
-        elif self.current_mode == ViewerMode.FREEHAND and event.button() == Qt.MouseButton.LeftButton:
-            self.finish_freehand_drawing()
-        elif self.current_mode == ViewerMode.EDIT and event.button() == Qt.MouseButton.LeftButton:
-            self.handle_edit_mode_release()
+        handler = self.release_handler
+        if handler is not None and event.button() == Qt.MouseButton.LeftButton:
+            handler()
         super().mouseReleaseEvent(event)
     
     def mouseDoubleClickEvent(self, event):
@@ -160,6 +194,15 @@ class ArtifactGraphicsScene(QGraphicsScene):
             return
         super().mouseDoubleClickEvent(event)
 
+    def emit_preview_request(self):
+        """Emit the coalesced segmentation preview request for the last hover position."""
+        if self.pending_preview_pos is None or self.current_mode != ViewerMode.POINT:
+            self.pending_preview_pos = None
+            return
+        position = self.pending_preview_pos
+        self.pending_preview_pos = None
+        self.segmentation_preview_requested.emit(position)
+
     def start_painting(self, position):
         self.current_paint_path = QPainterPath()
         self.current_paint_path.moveTo(position)
@@ -170,6 +213,11 @@ class ArtifactGraphicsScene(QGraphicsScene):
             self.current_paint_path.lineTo(position)
             self.current_paint_item.setPath(self.current_paint_path)
 
+    def finish_painting(self):
+        """Request segmentation for the painted stroke and fade it out."""
+        self.add_shape_from_paint_path()
+        self.stop_painting()
+
     def stop_painting(self):
         if self.current_paint_item:
             self.fade_out_item(self.current_paint_item)
@@ -177,29 +225,67 @@ class ArtifactGraphicsScene(QGraphicsScene):
             self.current_paint_path = None
 
     def start_erasing(self, position):
-        print(f"Starting erasing at position {position}")
+        logger.debug("Starting erasing at position %s", position)
         self.eraser_path = QPainterPath()
         self.eraser_path.moveTo(position)
         # Create a visual feedback for erasing (more visible red color)
         self.eraser_item = self.addPath(self.eraser_path, 
                                       QPen(QColor(255, 255, 255, 127), self.brush_size))
         self.eraser_points = []  # Reset eraser points
-        self.eraser_points.append(position)  # Add the first point
+        self.eraser_points_count = 0
+        self.eraser_points_source = self.eraser_points
+        self.append_eraser_point(position)  # Add the first point
 
     def erase(self, position):
         if not self.eraser_path:
             return
 
+        # Skip moves that barely advance the stroke; they only add vertices to every
+        # later geometric step without changing the erased area
+        if self.eraser_points:
+            last_point = self.eraser_points[-1]
+            dx = position.x() - last_point.x()
+            dy = position.y() - last_point.y()
+            min_step = max(1.0, self.brush_size * ERASER_MIN_STEP_FRACTION)
+            if dx * dx + dy * dy < min_step * min_step:
+                return
+
         self.eraser_path.lineTo(position)
         if self.eraser_item:
             self.eraser_item.setPath(self.eraser_path)
-            self.eraser_points.append(position)
+            self.append_eraser_point(position)
+
+    def append_eraser_point(self, position):
+        """Add a point to the eraser stroke, keeping the coordinate array in sync."""
+        self.eraser_points.append(position)
+        if self.eraser_points_source is not self.eraser_points:
+            return
+        if self.eraser_points_count == len(self.eraser_points_buffer):
+            grown = np.empty((2 * len(self.eraser_points_buffer), 2), dtype=np.float64)
+            grown[:self.eraser_points_count] = self.eraser_points_buffer
+            self.eraser_points_buffer = grown
+        self.eraser_points_buffer[self.eraser_points_count] = (position.x(), position.y())
+        self.eraser_points_count += 1
+
+    def eraser_points_array(self):
+        """Return the eraser stroke as an (N, 2) float64 array of x, y coordinates.
+
+        Uses the array filled in by append_eraser_point, and rebuilds it when
+        eraser_points was replaced or modified directly.
+        """
+        if self.eraser_points_source is not self.eraser_points or self.eraser_points_count != len(self.eraser_points):
+            coords = np.array([(p.x(), p.y()) for p in self.eraser_points], dtype=np.float64).reshape(-1, 2)
+            self.eraser_points_buffer = np.empty((max(64, len(coords)), 2), dtype=np.float64)
+            self.eraser_points_buffer[:len(coords)] = coords
+            self.eraser_points_count = len(coords)
+            self.eraser_points_source = self.eraser_points
+        return self.eraser_points_buffer[:self.eraser_points_count]
 
     def stop_erasing(self):
         """Stop erasing and process the erased region manually using geometric operations."""
-        print("stop_erasing called")
+        logger.debug("stop_erasing called")
         if not self.eraser_points or len(self.eraser_points) < 2:
-            print("No eraser points collected or not enough points")
+            logger.debug("No eraser points collected or not enough points")
             # Clean up visual feedback
             if self.eraser_item:
                 try:
@@ -213,58 +299,69 @@ class ArtifactGraphicsScene(QGraphicsScene):
                 self.eraser_points = []
             return
 
-        print(f"Collected {len(self.eraser_points)} eraser points")
+        logger.debug("Collected %s eraser points", len(self.eraser_points))
         
         # Find all polygons that intersect with the eraser path
         eraser_bounds = self.eraser_path.boundingRect()
-        items_in_bounds = self.items(eraser_bounds)
+        # Bounding rects are enough to pick candidates from the scene's index; the exact
+        # geometric tests below decide, so Qt need not build and test every item's shape
+        items_in_bounds = self.items(eraser_bounds, Qt.ItemSelectionMode.IntersectsItemBoundingRect)
         
-        print(f"Found {len(items_in_bounds)} items in eraser bounds")
+        logger.debug("Found %s items in eraser bounds", len(items_in_bounds))
+        
+        # Eraser point coordinates, used to prefilter points against each polygon's bounding box
+        eraser_coords = self.eraser_points_array()
+        # The whole eraser path as one line, so crossings are tested in a single Shapely call per polygon
+        eraser_line = LineString(eraser_coords)
+        
+        # Keep only the polygons whose bounding box the eraser path actually passes
+        # through, tested for all candidates in one vectorized Shapely call
+        candidates = [item for item in items_in_bounds
+                      if isinstance(item, ArtifactPolygonItem) and item != self.eraser_item]
+        # Bounding boxes are cached on the items, so unchanged polygons are not rescanned
+        candidate_bounds = [item.polygon_bounds() for item in candidates]
+        if candidates:
+            rect_bounds = np.array(candidate_bounds)
+            boxes = shapely.box(rect_bounds[:, 0], rect_bounds[:, 1], rect_bounds[:, 2], rect_bounds[:, 3])
+            path_touches_box = shapely.intersects(boxes, eraser_line)
+        else:
+            path_touches_box = []
         
         # Find all polygons that intersect with our eraser path
         polygons_to_erase = []
-        for item in items_in_bounds:
-            if isinstance(item, ArtifactPolygonItem) and item != self.eraser_item:
+        for item, (left, top, right, bottom), touches_box in zip(candidates, candidate_bounds, path_touches_box):
+            if touches_box:
                 # Check if eraser path intersects with the polygon
-                polygon = item.polygon()
                 eraser_intersects = False
                 
-                # Check if any eraser point is inside the polygon
-                for point in self.eraser_points:
-                    if polygon.containsPoint(point, Qt.FillRule.OddEvenFill):
-                        eraser_intersects = True
-                        break
+                # Check if any eraser point is inside the polygon, only testing
+                # the points that fall within the polygon's bounding box
+                in_bbox = ((eraser_coords[:, 0] >= left) & (eraser_coords[:, 0] <= right) &
+                           (eraser_coords[:, 1] >= top) & (eraser_coords[:, 1] <= bottom))
+                if np.any(in_bbox):
+                    eraser_intersects = bool(np.any(self.points_in_polygon(item.polygon(), eraser_coords[in_bbox])))
                 
                 # Also check if eraser path intersects polygon boundary
                 if not eraser_intersects:
-                    # Convert polygon to Shapely for intersection checking
-                    polygon_shapely = self.qpolygonf_to_shapely(polygon)
+                    # Shapely version of the polygon, cached on the item between strokes
+                    polygon_shapely = item.shapely_polygon()
                     
-                    # Check if the eraser path intersects with the polygon
-                    # by checking if any segment of the eraser path intersects the polygon
-                    for i in range(len(self.eraser_points) - 1):
-                        p1 = self.eraser_points[i]
-                        p2 = self.eraser_points[i + 1]
-                        # Create a Shapely LineString from the line segment
-                        line_segment = LineString([(p1.x(), p1.y()), (p2.x(), p2.y())])
-                        # Check if this line segment intersects the polygon
-                        if polygon_shapely.intersects(line_segment):
-                            eraser_intersects = True
-                            break
+                    # The path intersects the polygon if any of its segments does
+                    eraser_intersects = polygon_shapely.intersects(eraser_line)
                 
                 if eraser_intersects:
-                    print(f"Found polygon to modify (eraser path intersects with polygon)")
+                    logger.debug("Found polygon to modify (eraser path intersects with polygon)")
                     polygons_to_erase.append(item)
 
         if polygons_to_erase:
             # Process manual erasing for all intersecting polygons
             self.process_manual_erasing(polygons_to_erase)
         else:
-            print("No polygon found intersecting with eraser path")
+            logger.debug("No polygon found intersecting with eraser path")
 
         # Clean up visual feedback
         if self.eraser_item:
-            print("Removing eraser visual feedback")
+            logger.debug("Removing eraser visual feedback")
             try:
                 scene = self.eraser_item.scene()
                 if scene == self:
@@ -273,7 +370,7 @@ class ArtifactGraphicsScene(QGraphicsScene):
                 # Item might have been deleted or scene changed
                 pass
             except Exception as e:
-                print(f"Error removing eraser item: {e}")
+                logger.error("Error removing eraser item: %s", e)
             finally:
                 self.eraser_item = None
                 self.eraser_path = None
@@ -281,38 +378,40 @@ class ArtifactGraphicsScene(QGraphicsScene):
 
     def smooth_eraser_path(self):
         """Apply smoothing to the eraser path similar to freehand mode."""
-        if len(self.eraser_points) < 3:
-            return [QPointF(p.x(), p.y()) for p in self.eraser_points]
+        return [QPointF(x, y) for x, y in self.smooth_eraser_coords().tolist()]
+
+    def smooth_eraser_coords(self, window_size=3):
+        """Return the eraser path smoothed by a moving average as an (N, 2) array."""
+        return self.moving_average_coords(self.eraser_points_array(), window_size)
+
+    def moving_average_coords(self, coords, window_size=3):
+        """Smooth an (N, 2) coordinate array with a moving average, keeping one point per input point."""
+        if len(coords) < max(3, window_size):
+            return coords.copy()
         
-        # Convert to numpy arrays for smoothing
-        x_coords = np.array([p.x() for p in self.eraser_points], dtype=np.float64)
-        y_coords = np.array([p.y() for p in self.eraser_points], dtype=np.float64)
+        # Pad the ends so the output keeps one point per input point
+        half = window_size // 2
+        padded = np.pad(coords, ((half, half), (0, 0)), mode='edge')
         
-        # Apply a simple moving average with a small window (3 points) for slight smoothing
-        window_size = 3
-        if len(x_coords) >= window_size:
-            # Pad the arrays to handle edges
-            x_padded = np.pad(x_coords, (window_size//2, window_size//2), mode='edge')
-            y_padded = np.pad(y_coords, (window_size//2, window_size//2), mode='edge')
-            
-            # Apply moving average
-            x_smoothed = np.convolve(x_padded, np.ones(window_size)/window_size, mode='valid')
-            y_smoothed = np.convolve(y_padded, np.ones(window_size)/window_size, mode='valid')
-            
-            # Convert back to QPointF list
-            return [QPointF(float(x), float(y)) for x, y in zip(x_smoothed, y_smoothed)]
-        else:
-            return [QPointF(p.x(), p.y()) for p in self.eraser_points]
+        # Moving average from a running sum, one O(N) pass for both axes
+        running_sum = np.zeros((len(padded) + 1, 2), dtype=np.float64)
+        np.cumsum(padded, axis=0, out=running_sum[1:])
+        return (running_sum[window_size:] - running_sum[:-window_size]) / window_size
     
     def eraser_path_to_polygon(self, smoothed_points):
-        """Convert the eraser path to a polygon considering brush size."""
+        """Convert the eraser path (QPointF list or (N, 2) array) to a polygon considering brush size."""
         if len(smoothed_points) < 2:
             return None
         
         try:
             # Create a LineString from the smoothed points
-            coords = [(p.x(), p.y()) for p in smoothed_points]
+            if isinstance(smoothed_points, np.ndarray):
+                coords = smoothed_points
+            else:
+                coords = [(p.x(), p.y()) for p in smoothed_points]
             line = LineString(coords)
+            # Drop near-collinear vertices; the buffer below hides sub-pixel deviations
+            line = line.simplify(ERASER_SIMPLIFY_TOLERANCE)
             
             # Validate the line
             if not line.is_valid:
@@ -330,20 +429,45 @@ class ArtifactGraphicsScene(QGraphicsScene):
             
             # Validate the result
             if eraser_polygon.is_empty or not eraser_polygon.is_valid:
-                print("Invalid eraser polygon created")
+                logger.warning("Invalid eraser polygon created")
                 return None
             
             return eraser_polygon
         except Exception as e:
-            print(f"Error creating eraser polygon: {e}")
+            logger.error("Error creating eraser polygon: %s", e)
             return None
     
+    def qpolygonf_to_array(self, qpolygon):
+        """Return the vertices of a QPolygonF as an (N, 2) float64 array."""
+        count = qpolygon.count()
+        if count == 0:
+            return np.empty((0, 2), dtype=np.float64)
+        # QPolygonF stores its points as consecutive (x, y) doubles, so copy the buffer directly
+        ptr = qpolygon.data()
+        ptr.setsize(count * 16)
+        return np.frombuffer(ptr, dtype=np.float64).reshape(count, 2).copy()
+
+    def array_to_qpolygonf(self, coords):
+        """Build a QPolygonF from an (N, 2) array of x, y coordinates."""
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        qpolygon = QPolygonF()
+        if len(coords) == 0:
+            return qpolygon
+        qpolygon.resize(len(coords))
+        # Fill the point buffer in one copy instead of constructing a QPointF per vertex
+        ptr = qpolygon.data()
+        ptr.setsize(len(coords) * 16)
+        np.frombuffer(ptr, dtype=np.float64).reshape(-1, 2)[:] = coords
+        return qpolygon
+
     def qpolygonf_to_shapely(self, qpolygon):
         """Convert QPolygonF to Shapely Polygon."""
-        coords = [(point.x(), point.y()) for point in qpolygon]
+        coords = self.qpolygonf_to_array(qpolygon)
+        if len(coords) == 0:
+            return ShapelyPolygon()
         # Ensure polygon is closed
-        if coords and coords[0] != coords[-1]:
-            coords.append(coords[0])
+        if (coords[0] != coords[-1]).any():
+            coords = np.vstack([coords, coords[:1]])
         return ShapelyPolygon(coords)
     
     def shapely_to_qpolygonf(self, shapely_poly):
@@ -351,13 +475,104 @@ class ArtifactGraphicsScene(QGraphicsScene):
         if shapely_poly.is_empty:
             return None
         # Get exterior coordinates
-        coords = list(shapely_poly.exterior.coords)
+        coords = np.asarray(shapely_poly.exterior.coords)[:, :2]
         # Remove duplicate last point if present (Shapely includes it)
-        if len(coords) > 1 and coords[0] == coords[-1]:
+        if len(coords) > 1 and (coords[0] == coords[-1]).all():
             coords = coords[:-1]
-        points = [QPointF(float(x), float(y)) for x, y in coords]
-        return QPolygonF(points)
-    
+        return self.array_to_qpolygonf(coords)
+
+    def points_in_polygon(self, polygon, points):
+        """Return a boolean array telling which (x, y) rows of points lie inside polygon (even-odd rule)."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        inside = np.zeros(len(points), dtype=bool)
+        if polygon.count() < 3 or len(points) == 0:
+            return inside
+        verts = self.qpolygonf_to_array(polygon)
+        x = points[:, 0][:, None]
+        y = points[:, 1][:, None]
+        xi, yi = verts[:, 0], verts[:, 1]
+        xj, yj = np.roll(xi, 1), np.roll(yi, 1)
+        # Crossing-number test (PNPOLY), evaluated for every point/edge pair at once
+        straddles = (yi > y) != (yj > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = (xj - xi) * (y - yi) / (yj - yi) + xi
+        crossings = straddles & (x < x_cross)
+        inside = np.count_nonzero(crossings, axis=1) % 2 == 1
+        return inside
+
+    def polygon_to_mask_array(self, polygon, width, height, origin=(0, 0)):
+        """Rasterize a QPolygonF into a binary uint8 numpy mask of the given size.
+
+        origin is the (x, y) scene position of the mask's top-left pixel.
+        """
+        mask = np.zeros((height, width), dtype=np.uint8)
+        if polygon.count() < 3:
+            return mask
+        points = np.rint(self.qpolygonf_to_array(polygon) - origin).astype(np.int32)
+        cv2.fillPoly(mask, [points], 1)
+        return mask
+
+    def stroke_to_mask_array(self, points, width, height, pen_width, origin=(0, 0)):
+        """Rasterize a polyline (QPointF list or (N, 2) array) into a binary uint8 numpy mask of the given size.
+
+        origin is the (x, y) scene position of the mask's top-left pixel.
+        Segments touching a null point are skipped, as when drawing them one by one with QPainter.
+        """
+        mask = np.zeros((height, width), dtype=np.uint8)
+        if isinstance(points, np.ndarray):
+            coords = points.reshape(-1, 2)
+        else:
+            coords = np.array([(p.x(), p.y()) for p in points], dtype=np.float64).reshape(-1, 2)
+        # Split the stroke into runs of consecutive non-null points
+        null_rows = np.flatnonzero((coords[:, 0] == 0) & (coords[:, 1] == 0))
+        starts = np.concatenate(([0], null_rows + 1))
+        ends = np.concatenate((null_rows, [len(coords)]))
+        shifted = np.rint(coords - origin).astype(np.int32)
+        polylines = [shifted[start:end] for start, end in zip(starts.tolist(), ends.tolist()) if end - start >= 2]
+        if polylines:
+            thickness = max(1, int(round(pen_width)))
+            cv2.polylines(mask, polylines, False, 1, thickness=thickness)
+        return mask
+
+    def qimage_to_mask_array(self, qimage):
+        """Convert a Grayscale8 QImage to a binary uint8 numpy mask (1 where the pixel is non-zero)."""
+        width = qimage.width()
+        height = qimage.height()
+        # Read the pixel buffer directly; rows are padded to bytesPerLine
+        ptr = qimage.constBits()
+        ptr.setsize(qimage.sizeInBytes())
+        pixels = np.frombuffer(ptr, dtype=np.uint8).reshape((height, qimage.bytesPerLine()))[:, :width]
+        # Booleans are stored as 0/1 bytes, so the comparison result can be viewed as uint8
+        return np.greater(pixels, 0).view(np.uint8)
+
+    def dilate_mask(self, mask, iterations=1):
+        """Binary dilation of a mask, equivalent to ndimage.binary_dilation(mask, iterations=iterations)."""
+        structure = ndimage.iterate_structure(ndimage.generate_binary_structure(2, 1), iterations)
+        dilated = cv2.dilate(np.ascontiguousarray(mask, dtype=np.uint8), structure.astype(np.uint8))
+        return dilated > 0
+
+    def roi_to_scene_mask(self, roi_mask, origin, width, height):
+        """Place a mask computed over a region of interest into a scene-sized boolean mask."""
+        scene_mask = np.zeros((height, width), dtype=bool)
+        roi_height, roi_width = roi_mask.shape
+        scene_mask[origin[1]:origin[1] + roi_height, origin[0]:origin[0] + roi_width] = roi_mask
+        return scene_mask
+
+    def mask_array_to_qimage(self, mask):
+        """Convert a binary numpy mask to a Grayscale8 QImage (255 where the mask is set)."""
+        height, width = mask.shape
+        if mask.dtype != bool:
+            mask = mask != 0
+        qimage = QImage(width, height, QImage.Format.Format_Grayscale8)
+        if width == 0 or height == 0:
+            return qimage
+        # Scale straight into the image's own pixel buffer; rows are padded to bytesPerLine
+        ptr = qimage.bits()
+        ptr.setsize(qimage.sizeInBytes())
+        pixels = np.frombuffer(ptr, dtype=np.uint8).reshape((height, qimage.bytesPerLine()))[:, :width]
+        np.multiply(mask, np.uint8(255), out=pixels)
+        return qimage
+
     def process_manual_erasing(self, polygons_to_erase):
         """Process manual erasing using geometric operations."""
         if not polygons_to_erase or not self.eraser_points:
@@ -365,15 +580,15 @@ class ArtifactGraphicsScene(QGraphicsScene):
         
         try:
             # Smooth the eraser path
-            smoothed_points = self.smooth_eraser_path()
+            smoothed_points = self.smooth_eraser_coords()
             if len(smoothed_points) < 2:
-                print("Not enough smoothed points for erasing")
+                logger.debug("Not enough smoothed points for erasing")
                 return
             
             # Convert eraser path to polygon
             eraser_polygon = self.eraser_path_to_polygon(smoothed_points)
             if eraser_polygon is None or eraser_polygon.is_empty:
-                print("Could not create eraser polygon")
+                logger.debug("Could not create eraser polygon")
                 return
             
             # Minimum area threshold for keeping polygons (in pixels squared)
@@ -394,21 +609,22 @@ class ArtifactGraphicsScene(QGraphicsScene):
                     original_text = polygon_item.text_attribute
                     original_pen = QPen(polygon_item.pen())  # Make a copy
                     original_brush = QBrush(polygon_item.brush())  # Make a copy
+                    # Shapely version of the polygon, cached on the item between strokes
+                    original_shapely = polygon_item.shapely_polygon()
                 except (RuntimeError, AttributeError) as e:
-                    print(f"Error capturing original item data: {e}")
+                    logger.error("Error capturing original item data: %s", e)
                     continue
-                
-                # Convert to Shapely
-                original_shapely = self.qpolygonf_to_shapely(original_polygon)
+
                 if original_shapely.is_empty:
-                    print("Original polygon is empty, skipping")
+                    logger.debug("Original polygon is empty, skipping")
                     continue
                 
-                # Perform difference operation
+                # Perform difference operation; a single GEOS overlay call is faster here
+                # than splitting large polygons into tiles and unioning the pieces back
                 try:
                     result = original_shapely.difference(eraser_polygon)
                 except Exception as e:
-                    print(f"Error performing difference operation: {e}")
+                    logger.error("Error performing difference operation: %s", e)
                     continue
                 
                 # Handle the result (could be Polygon or MultiPolygon)
@@ -440,18 +656,18 @@ class ArtifactGraphicsScene(QGraphicsScene):
                 
                 # Remove the original polygon (only if we have results, otherwise it's completely erased)
                 if result_polygons:
-                    if polygon_item in self.items():
+                    if polygon_item.scene() is self:
                         # Remove text item
                         if polygon_item.text_item and polygon_item.text_item.scene():
                             self.removeItem(polygon_item.text_item)
                         self.removeItem(polygon_item)
                 else:
                     # Polygon is completely erased or too small - remove it
-                    if polygon_item in self.items():
+                    if polygon_item.scene() is self:
                         if polygon_item.text_item and polygon_item.text_item.scene():
                             self.removeItem(polygon_item.text_item)
                         self.removeItem(polygon_item)
-                    print(f"Polygon completely erased or too small (area < {min_area_threshold})")
+                    logger.debug("Polygon completely erased or too small (area < %s)", min_area_threshold)
                     # Still keep original_items and original_items_data for undo, but no new items
                     # The item has already been added to both lists above
                     continue
@@ -460,8 +676,11 @@ class ArtifactGraphicsScene(QGraphicsScene):
                 # If there are multiple polygons (split), assign random colors to each
                 # If there's only one polygon, keep the original color
                 use_random_colors = len(result_polygons) > 1
+                if use_random_colors:
+                    # One random color per split polygon, drawn up front
+                    palette = self.rng.integers(0, 256, size=(len(result_polygons), 3)).tolist()
                 
-                for result_poly in result_polygons:
+                for index, result_poly in enumerate(result_polygons):
                     qpolygon = self.shapely_to_qpolygonf(result_poly)
                     if qpolygon and qpolygon.count() >= 3:
                         # Create new polygon item with same attributes
@@ -470,11 +689,8 @@ class ArtifactGraphicsScene(QGraphicsScene):
                         
                         # Assign colors: random if split, original if single
                         if use_random_colors:
-                            # Generate random color for split polygons
-                            import random
-                            r = random.randint(0, 255)
-                            g = random.randint(0, 255)
-                            b = random.randint(0, 255)
+                            # Take this split polygon's color from the palette
+                            r, g, b = palette[index]
                             
                             pen = QPen(QColor(r, g, b))
                             pen.setWidth(original_pen.width())
@@ -499,7 +715,7 @@ class ArtifactGraphicsScene(QGraphicsScene):
                                 'brush': QBrush(new_item.brush())
                             })
                         except (RuntimeError, AttributeError) as e:
-                            print(f"Error capturing new item data: {e}")
+                            logger.error("Error capturing new item data: %s", e)
                             # Fallback: use the data we already have
                             if use_random_colors:
                                 fallback_pen = QPen(QColor(r, g, b))
@@ -515,7 +731,7 @@ class ArtifactGraphicsScene(QGraphicsScene):
                                 'brush': fallback_brush
                             })
                         
-                        print(f"Created new polygon with {qpolygon.count()} points, area: {result_poly.area}")
+                        logger.debug("Created new polygon with %s points, area: %s", qpolygon.count(), result_poly.area)
                 
                 all_new_items.extend(new_items_for_this_polygon)
                 new_items_data.extend(new_items_data_for_this_polygon)
@@ -537,30 +753,24 @@ class ArtifactGraphicsScene(QGraphicsScene):
                 try:
                     self.erasing_complete.emit(original_items, all_new_items, original_items_data, new_items_data)
                 except Exception as e:
-                    print(f"Error emitting erasing_complete signal: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.exception("Error emitting erasing_complete signal: %s", e)
             
             # Emit signal to update UI
             try:
                 self.attribute_changed.emit()
             except Exception as e:
-                print(f"Error emitting attribute_changed signal: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("Error emitting attribute_changed signal: %s", e)
                 
         except Exception as e:
-            print(f"Error in process_manual_erasing: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error in process_manual_erasing: %s", e)
     
     def process_erased_region(self):
         if not self.current_erasing_polygon or not self.eraser_points:
-            print("No polygon or eraser points to process")
+            logger.debug("No polygon or eraser points to process")
             return
 
         try:
-            print("Processing erased region...")
+            logger.debug("Processing erased region...")
             # Get the polygon
             polygon = self.current_erasing_polygon.polygon()
             
@@ -569,67 +779,71 @@ class ArtifactGraphicsScene(QGraphicsScene):
             
             # Create masks for both the polygon and eraser
             scene_rect = self.sceneRect()
-            print(f"Scene rect: {scene_rect}")
+            logger.debug("Scene rect: %s", scene_rect)
             mask_width = int(scene_rect.width())
             mask_height = int(scene_rect.height())
             if mask_width <= 0 or mask_height <= 0:
-                print("Invalid scene rect dimensions")
+                logger.debug("Invalid scene rect dimensions")
                 return
                 
-            # Create and fill polygon mask
-            polygon_mask = QImage(mask_width, mask_height, QImage.Format.Format_Grayscale8)
-            polygon_mask.fill(Qt.GlobalColor.transparent)
-            polygon_painter = QPainter(polygon_mask)
-            polygon_painter.setPen(QPen(Qt.GlobalColor.white))
-            polygon_painter.setBrush(QBrush(Qt.GlobalColor.white))
-            polygon_painter.drawPolygon(polygon)
-            polygon_painter.end()
-            
-            # Create and fill eraser mask with a wider path to fill gaps
-            eraser_mask = QImage(mask_width, mask_height, QImage.Format.Format_Grayscale8)
-            eraser_mask.fill(Qt.GlobalColor.transparent)
-            eraser_painter = QPainter(eraser_mask)
-            eraser_painter.setPen(QPen(Qt.GlobalColor.white, self.brush_size * 1.5))  # Slightly wider to fill gaps
-            for i in range(1, len(self.eraser_points)):
-                p1 = self.eraser_points[i-1]
-                p2 = self.eraser_points[i]
-                if not (p1.isNull() or p2.isNull()):
-                    eraser_painter.drawLine(p1, p2)
-            eraser_painter.end()
-
-            print("Created polygon and eraser masks")
-
-            # Convert QImage to numpy array for the polygon mask
-            polygon_mask_array = np.zeros((mask_height, mask_width), dtype=np.uint8)
-            eraser_mask_array = np.zeros((mask_height, mask_width), dtype=np.uint8)
-            
-            # Convert both masks to numpy arrays
-            for y in range(mask_height):
-                for x in range(mask_width):
-                    polygon_mask_array[y, x] = 1 if polygon_mask.pixelColor(x, y).value() > 0 else 0
-                    eraser_mask_array[y, x] = 1 if eraser_mask.pixelColor(x, y).value() > 0 else 0
+            # Only the polygon's neighbourhood can change, so all mask work happens in a
+            # region of interest around it, wide enough to hold the padded bounding boxes
+            padding = 10
+            roi_padding = padding + 2
+            poly_rect = polygon.boundingRect()
+            roi_left = max(0, int(np.floor(poly_rect.left())) - roi_padding)
+            roi_top = max(0, int(np.floor(poly_rect.top())) - roi_padding)
+            roi_right = min(mask_width, int(np.ceil(poly_rect.right())) + roi_padding + 1)
+            roi_bottom = min(mask_height, int(np.ceil(poly_rect.bottom())) + roi_padding + 1)
+            if roi_right <= roi_left or roi_bottom <= roi_top:
+                logger.debug("Polygon lies outside the scene rect")
+                return
+            roi_origin = (roi_left, roi_top)
+            roi_width = roi_right - roi_left
+            roi_height = roi_bottom - roi_top
+
+            # Rasterize the polygon mask directly into a numpy array
+            polygon_mask_array = self.polygon_to_mask_array(polygon, roi_width, roi_height, roi_origin)
+
+            # Rasterize the eraser stroke with a wider pen to fill gaps
+            eraser_mask_array = self.stroke_to_mask_array(
+                self.eraser_points_array(), roi_width, roi_height, self.brush_size * 1.5, roi_origin)
+
+            logger.debug("Created polygon and eraser masks")
 
             # Dilate the eraser mask to fill any small gaps
-            from scipy import ndimage
-            dilated_eraser = ndimage.binary_dilation(eraser_mask_array, iterations=2)
+            dilated_eraser = self.dilate_mask(eraser_mask_array, iterations=2)
             
+            # The polygon mask only holds 0/1, so it can be viewed as booleans without a copy
+            polygon_area = polygon_mask_array.view(bool)
+
+            # Neither eraser mask is needed once the two areas exist, so the areas are
+            # written into their buffers instead of allocating new ROI-sized arrays.
             # Create the erased area mask
-            erased_area = polygon_mask_array & dilated_eraser
+            erased_area = np.logical_and(polygon_area, dilated_eraser, out=eraser_mask_array.view(bool))
             
-            # Create the remaining area mask
-            remaining_area = polygon_mask_array & ~dilated_eraser
+            # Create the remaining area mask; for booleans p > d is p & ~d in a single pass
+            remaining_area = np.greater(polygon_area, dilated_eraser, out=dilated_eraser)
 
             # Use connected component labeling to check if the remaining area is split
-            labeled_remaining, num_components = ndimage.label(remaining_area)
+            # The same pass also yields every component's bounding box and area
+            num_labels, labeled_remaining, component_stats, _ = cv2.connectedComponentsWithStats(
+                remaining_area.view(np.uint8), connectivity=4)
+            num_components = num_labels - 1
+            # Row 0 describes the background; columns are left, top, width, height, area
+            component_stats = component_stats[1:]
+            component_lefts = component_stats[:, cv2.CC_STAT_LEFT]
+            component_tops = component_stats[:, cv2.CC_STAT_TOP]
+            component_rights = component_lefts + component_stats[:, cv2.CC_STAT_WIDTH] - 1
+            component_bottoms = component_tops + component_stats[:, cv2.CC_STAT_HEIGHT] - 1
             
-            # Calculate bounding box from remaining area
-            rows = np.any(remaining_area, axis=1)
-            cols = np.any(remaining_area, axis=0)
-            if rows.any() and cols.any():
-                min_y, max_y = np.where(rows)[0][[0, -1]]
-                min_x, max_x = np.where(cols)[0][[0, -1]]
+            # Calculate bounding box from remaining area as the union of the component boxes
+            if num_components > 0:
+                min_y = int(component_tops.min()) + roi_top
+                max_y = int(component_bottoms.max()) + roi_top
+                min_x = int(component_lefts.min()) + roi_left
+                max_x = int(component_rights.max()) + roi_left
                 # Add padding for SAM
-                padding = 10
                 min_x = max(0, min_x - padding)
                 min_y = max(0, min_y - padding)
                 max_x = min(mask_width - 1, max_x + padding)
@@ -638,129 +852,90 @@ class ArtifactGraphicsScene(QGraphicsScene):
             else:
                 bounding_box = None
 
-            # Sample points for the remaining area
-            foreground_points = []
-            background_points = []
-            
             # Sample points in a grid pattern within the remaining area
             grid_size = 5
-            for i in range(grid_size):
-                for j in range(grid_size):
-                    x = int(min_x + (i + 0.5) * (max_x - min_x) / grid_size)
-                    y = int(min_y + (j + 0.5) * (max_y - min_y) / grid_size)
-                    
-                    if 0 <= x < mask_width and 0 <= y < mask_height:
-                        if remaining_area[y, x]:
-                            foreground_points.append(QPointF(x, y))
-                        elif polygon_mask_array[y, x]:
-                            background_points.append(QPointF(x, y))
+            foreground_points, background_points = self.sample_grid_points(
+                remaining_area, polygon_mask_array, (min_x, min_y, max_x, max_y), grid_size, origin=roi_origin)
             
             # Ensure we have enough points
             target_points = 32
-            while len(foreground_points) < target_points:
-                x = int(min_x + np.random.random() * (max_x - min_x))
-                y = int(min_y + np.random.random() * (max_y - min_y))
-                if remaining_area[y, x]:
-                    foreground_points.append(QPointF(x, y))
-            
-            while len(background_points) < target_points:
-                x = int(min_x + np.random.random() * (max_x - min_x))
-                y = int(min_y + np.random.random() * (max_y - min_y))
-                if polygon_mask_array[y, x] and not remaining_area[y, x]:
-                    background_points.append(QPointF(x, y))
+            background_area = erased_area
+            # Draw the missing points from the candidate pixel sets directly; the erased
+            # strip in particular is too thin for rejection sampling to hit reliably
+            foreground_points += self.sample_points_from_mask(
+                remaining_area, (min_x, min_y, max_x, max_y), target_points - len(foreground_points),
+                origin=roi_origin)
+            background_points += self.sample_points_from_mask(
+                background_area, (min_x, min_y, max_x, max_y), target_points - len(background_points),
+                origin=roi_origin)
 
             if foreground_points and background_points:
                 # Convert remaining area mask to QImage
-                remaining_mask_qimage = QImage(mask_width, mask_height, QImage.Format.Format_Grayscale8)
-                for y in range(mask_height):
-                    for x in range(mask_width):
-                        remaining_mask_qimage.setPixelColor(x, y, QColor(255 if remaining_area[y, x] else 0))
+                remaining_mask_qimage = self.mask_array_to_qimage(
+                    self.roi_to_scene_mask(remaining_area, roi_origin, mask_width, mask_height))
                 
-                print("Emitting segmentation_with_points_requested with:")
-                print(f"  Foreground points: {len(foreground_points)}")
-                print(f"  Background points: {len(background_points)}")
-                print(f"  Bounding box: {bounding_box}")
+                logger.debug("Emitting segmentation_with_points_requested with:")
+                logger.debug("  Foreground points: %s", len(foreground_points))
+                logger.debug("  Background points: %s", len(background_points))
+                logger.debug("  Bounding box: %s", bounding_box)
                 # Check if we have a true split by analyzing the components
                 if num_components > 1:
-                    # Get the area of each component
-                    component_areas = []
-                    for component in range(1, num_components + 1):
-                        component_mask = (labeled_remaining == component)
-                        area = np.sum(component_mask)
-                        component_areas.append(area)
+                    # Get the area of each component from the labelling stats
+                    component_areas = component_stats[:, cv2.CC_STAT_AREA]
                     
                     # Calculate the total area of all components
-                    total_area = sum(component_areas)
+                    total_area = component_areas.sum()
                     
                     # If any component is too small relative to the total area, ignore it
                     # This helps prevent false splits from small gaps
-                    significant_components = []
-                    for i, area in enumerate(component_areas):
-                        if area > total_area * 0.1:  # Component must be at least 10% of total area
-                            significant_components.append(i + 1)
+                    # Component must be at least 10% of total area
+                    significant_components = (np.flatnonzero(component_areas > total_area * 0.1) + 1).tolist()
                     
                     if len(significant_components) > 1:
                         # We have a true split - process each significant component
                         for component in significant_components:
-                            component_mask = (labeled_remaining == component)
+                            # Calculate component bounding box from its stats
+                            index = component - 1
+                            comp_padding = 10
+                            comp_min_x = max(0, int(component_lefts[index]) + roi_left - comp_padding)
+                            comp_min_y = max(0, int(component_tops[index]) + roi_top - comp_padding)
+                            comp_max_x = min(mask_width - 1, int(component_rights[index]) + roi_left + comp_padding)
+                            comp_max_y = min(mask_height - 1, int(component_bottoms[index]) + roi_top + comp_padding)
+                            comp_bbox = [comp_min_x, comp_min_y, comp_max_x, comp_max_y]
                             
-                            # Calculate component bounding box
-                            rows = np.any(component_mask, axis=1)
-                            cols = np.any(component_mask, axis=0)
-                            if rows.any() and cols.any():
-                                comp_min_y, comp_max_y = np.where(rows)[0][[0, -1]]
-                                comp_min_x, comp_max_x = np.where(cols)[0][[0, -1]]
-                                comp_padding = 10
-                                comp_min_x = max(0, comp_min_x - comp_padding)
-                                comp_min_y = max(0, comp_min_y - comp_padding)
-                                comp_max_x = min(mask_width - 1, comp_max_x + comp_padding)
-                                comp_max_y = min(mask_height - 1, comp_max_y + comp_padding)
-                                comp_bbox = [comp_min_x, comp_min_y, comp_max_x, comp_max_y]
-                                
-                                # Sample points for this component
-                                comp_fg_points = []
-                                comp_bg_points = []
-                                
-                                # Sample points in a grid pattern within the component
-                                for i in range(grid_size):
-                                    for j in range(grid_size):
-                                        x = int(comp_min_x + (i + 0.5) * (comp_max_x - comp_min_x) / grid_size)
-                                        y = int(comp_min_y + (j + 0.5) * (comp_max_y - comp_min_y) / grid_size)
-                                        
-                                        if 0 <= x < mask_width and 0 <= y < mask_height:
-                                            if component_mask[y, x]:
-                                                comp_fg_points.append(QPointF(x, y))
-                                            elif polygon_mask_array[y, x]:
-                                                comp_bg_points.append(QPointF(x, y))
-                                
-                                # Ensure we have enough points
-                                while len(comp_fg_points) < target_points:
-                                    x = int(comp_min_x + np.random.random() * (comp_max_x - comp_min_x))
-                                    y = int(comp_min_y + np.random.random() * (comp_max_y - comp_min_y))
-                                    if component_mask[y, x]:
-                                        comp_fg_points.append(QPointF(x, y))
-                                
-                                while len(comp_bg_points) < target_points:
-                                    x = int(comp_min_x + np.random.random() * (comp_max_x - comp_min_x))
-                                    y = int(comp_min_y + np.random.random() * (comp_max_y - comp_min_y))
-                                    if polygon_mask_array[y, x] and not component_mask[y, x]:
-                                        comp_bg_points.append(QPointF(x, y))
+                            # Work on the padded bounding box window only
+                            window = (slice(comp_min_y - roi_top, comp_max_y - roi_top + 1),
+                                      slice(comp_min_x - roi_left, comp_max_x - roi_left + 1))
+                            window_origin = (comp_min_x, comp_min_y)
+                            component_mask = labeled_remaining[window] == component
+                            window_polygon_mask = polygon_area[window]
+                            
+                            # Sample points in a grid pattern within the component
+                            comp_fg_points, comp_bg_points = self.sample_grid_points(
+                                component_mask, window_polygon_mask, comp_bbox, grid_size, origin=window_origin)
+                            
+                            # Ensure we have enough points
+                            comp_background = window_polygon_mask & ~component_mask
+                            comp_fg_points += self.sample_points_from_mask(
+                                component_mask, comp_bbox, target_points - len(comp_fg_points),
+                                origin=window_origin)
+                            comp_bg_points += self.sample_points_from_mask(
+                                comp_background, comp_bbox, target_points - len(comp_bg_points),
+                                origin=window_origin)
+                            
+                            if comp_fg_points and comp_bg_points:
+                                # Convert component mask to QImage
+                                comp_mask_qimage = self.mask_array_to_qimage(
+                                    self.roi_to_scene_mask(component_mask, window_origin, mask_width, mask_height))
                                 
-                                if comp_fg_points and comp_bg_points:
-                                    # Convert component mask to QImage
-                                    comp_mask_qimage = QImage(mask_width, mask_height, QImage.Format.Format_Grayscale8)
-                                    for y in range(mask_height):
-                                        for x in range(mask_width):
-                                            comp_mask_qimage.setPixelColor(x, y, QColor(255 if component_mask[y, x] else 0))
-                                    
-                                    # Emit signal for segmentation with points
-                                    self.segmentation_with_points_requested.emit(
-                                        self.current_erasing_polygon if component == significant_components[0] else None,  # Only pass original polygon for first component
-                                        comp_fg_points,
-                                        comp_bg_points,
-                                        comp_mask_qimage,
-                                        comp_bbox
-                                    )
+                                # Emit signal for segmentation with points
+                                self.segmentation_with_points_requested.emit(
+                                    self.current_erasing_polygon if component == significant_components[0] else None,  # Only pass original polygon for first component
+                                    comp_fg_points,
+                                    comp_bg_points,
+                                    comp_mask_qimage,
+                                    comp_bbox
+                                )
                     else:
                         # No true split - treat as single component
                         self.segmentation_with_points_requested.emit(
@@ -781,7 +956,7 @@ class ArtifactGraphicsScene(QGraphicsScene):
                     )
             
             # Remove the original polygon after processing
-            if self.current_erasing_polygon in self.items():
+            if self.current_erasing_polygon.scene() is self:
                 self.removeItem(self.current_erasing_polygon)
             
             # Reset state
@@ -789,13 +964,63 @@ class ArtifactGraphicsScene(QGraphicsScene):
             self.eraser_points = []
 
         except Exception as e:
-            print(f"Error in process_erased_region: {str(e)}")
+            logger.error("Error in process_erased_region: %s", e)
             self.cleanup_debug_visualization()
 
+    def sample_grid_points(self, foreground_mask, polygon_mask, bbox, grid_size, origin=(0, 0)):
+        """Sample a grid_size x grid_size grid over bbox = (min_x, min_y, max_x, max_y).
+
+        Grid points inside foreground_mask become foreground points; points inside
+        polygon_mask but outside foreground_mask become background points.
+        The masks' top-left pixel sits at scene position origin; bbox and the
+        returned points are in scene coordinates.
+        Returns (foreground_points, background_points) as lists of QPointF.
+        """
+        min_x, min_y, max_x, max_y = bbox
+        origin_x, origin_y = origin
+        height, width = foreground_mask.shape
+        offsets = np.arange(grid_size) + 0.5
+        xs = (min_x + offsets * (max_x - min_x) / grid_size).astype(int)
+        ys = (min_y + offsets * (max_y - min_y) / grid_size).astype(int)
+        # 'ij' indexing keeps the x-major ordering of the original nested loops
+        grid_x, grid_y = np.meshgrid(xs, ys, indexing='ij')
+        grid_x = grid_x.ravel()
+        grid_y = grid_y.ravel()
+        valid = ((grid_x >= origin_x) & (grid_x < origin_x + width) &
+                 (grid_y >= origin_y) & (grid_y < origin_y + height))
+        grid_x = grid_x[valid]
+        grid_y = grid_y[valid]
+        in_foreground = foreground_mask[grid_y - origin_y, grid_x - origin_x].astype(bool)
+        in_background = ~in_foreground & polygon_mask[grid_y - origin_y, grid_x - origin_x].astype(bool)
+        foreground_points = [QPointF(x, y) for x, y in zip(grid_x[in_foreground].tolist(), grid_y[in_foreground].tolist())]
+        background_points = [QPointF(x, y) for x, y in zip(grid_x[in_background].tolist(), grid_y[in_background].tolist())]
+        return foreground_points, background_points
+
+    def sample_points_from_mask(self, candidate_mask, bbox, count, origin=(0, 0)):
+        """Randomly pick count points among the pixels of candidate_mask within bbox = (min_x, min_y, max_x, max_y).
+
+        Draws from the set of candidate pixels, so it also works for sparse or thin
+        regions. Points are distinct unless the region has fewer than count pixels. Returns a list of QPointF in scene coordinates.
+        """
+        if count <= 0:
+            return []
+        min_x, min_y, max_x, max_y = (int(v) for v in bbox)
+        origin_x, origin_y = origin
+        window = candidate_mask[max(0, min_y - origin_y):max(0, max(max_y, min_y + 1) - origin_y),
+                                max(0, min_x - origin_x):max(0, max(max_x, min_x + 1) - origin_x)]
+        pool = np.flatnonzero(window)
+        if len(pool) == 0:
+            return []
+        choice = self.rng.choice(pool, count, replace=len(pool) < count)
+        ys, xs = np.unravel_index(choice, window.shape)
+        xs = xs + max(min_x, origin_x)
+        ys = ys + max(min_y, origin_y)
+        return [QPointF(x, y) for x, y in zip(xs.tolist(), ys.tolist())]
+
     def process_points_after_delay(self):
         """Process the points after the visualization delay."""
         if not hasattr(self, '_current_points') or not self._current_points:
-            print("No points to process after delay")
+            logger.debug("No points to process after delay")
             return
             
         foreground_points, background_points, polygon_mask = self._current_points
@@ -805,14 +1030,10 @@ class ArtifactGraphicsScene(QGraphicsScene):
         self.cleanup_debug_visualization()
         
         # Convert numpy array back to QImage
-        height, width = polygon_mask.shape
-        polygon_mask_qimage = QImage(width, height, QImage.Format.Format_Grayscale8)
-        for y in range(height):
-            for x in range(width):
-                polygon_mask_qimage.setPixelColor(x, y, QColor(255 if polygon_mask[y, x] else 0))
+        polygon_mask_qimage = self.mask_array_to_qimage(polygon_mask)
         
         # Emit signal for segmentation with points
-        print("Emitting segmentation_with_points_requested signal...")
+        logger.debug("Emitting segmentation_with_points_requested signal...")
         self.segmentation_with_points_requested.emit(
             self.current_erasing_polygon,
             foreground_points,
@@ -820,10 +1041,10 @@ class ArtifactGraphicsScene(QGraphicsScene):
             polygon_mask_qimage,
             bounding_box
         )
-        print("Signal emitted")
+        logger.debug("Signal emitted")
         
         # Remove the original polygon
-        if self.current_erasing_polygon in self.items():
+        if self.current_erasing_polygon is not None and self.current_erasing_polygon.scene() is self:
             self.removeItem(self.current_erasing_polygon)
         
         # Reset state
@@ -843,16 +1064,23 @@ class ArtifactGraphicsScene(QGraphicsScene):
             # In test mode, remove the item immediately
             self.removeItem(item)
         else:
-            # In normal mode, use fade-out animation
+            # In normal mode, use a fade-out animation driven by Qt's animation framework
             item.setOpacity(1.0)
-            def fade_step(opacity):
-                if opacity > 0:
-                    item.setOpacity(opacity)
-                    QTimer.singleShot(50, lambda: fade_step(opacity - 0.05))
-                else:
-                    self.removeItem(item)
+            animation = QVariantAnimation()
+            animation.setDuration(1000)
+            animation.setStartValue(1.0)
+            animation.setEndValue(0.0)
+            animation.valueChanged.connect(item.setOpacity)
+            animation.finished.connect(lambda: self.finish_fade_out(animation, item))
+            # Keep a reference so the animation is not garbage collected while running
+            self.fade_animations.add(animation)
+            animation.start()
 
-            fade_step(1.0)
+    def finish_fade_out(self, animation, item):
+        """Remove a faded-out item and release its animation."""
+        self.fade_animations.discard(animation)
+        if item.scene() == self:
+            self.removeItem(item)
 
     def handle_edit_mode_click(self, scene_pos, ctrl_pressed):
         """Handle mouse click in edit mode (called after event propagation)."""
@@ -949,7 +1177,7 @@ class ArtifactGraphicsScene(QGraphicsScene):
             # Validate polygon first
             polygon = polygon_item.polygon()
             if polygon is None or polygon.count() < 3:
-                print(f"Invalid polygon (None or < 3 points)")
+                logger.warning("Invalid polygon (None or < 3 points)")
                 return None
             
             text_attr = polygon_item.text_attribute
@@ -958,7 +1186,7 @@ class ArtifactGraphicsScene(QGraphicsScene):
             
             # Validate pen and brush
             if pen is None or brush is None:
-                print(f"Invalid pen or brush")
+                logger.warning("Invalid pen or brush")
                 return None
         except (RuntimeError, AttributeError, TypeError):
             return None
@@ -1087,6 +1315,7 @@ class ArtifactGraphicsScene(QGraphicsScene):
         """Set the current mode of the scene."""
         old_mode = self.current_mode
         self.current_mode = mode
+        self.update_mouse_handlers()
         
         # Clean up any preview polygons or temporary items
         if hasattr(self, 'preview_polygon') and self.preview_polygon:
@@ -1213,26 +1442,48 @@ class ArtifactGraphicsScene(QGraphicsScene):
 
     def add_shape_from_paint_path(self):
         if not self.current_paint_path:
-            print("No paint path to process")
+            logger.debug("No paint path to process")
             return
 
-        mask = QImage(self.sceneRect().size().toSize(), QImage.Format.Format_Grayscale8)
-        mask.fill(Qt.GlobalColor.transparent)
-
-        painter = QPainter(mask)
-        painter.setPen(QPen(Qt.GlobalColor.white))
-        painter.setBrush(QBrush(Qt.GlobalColor.white))
-        painter.drawPath(self.current_paint_path)
-        painter.end()
+        # Only the stroke's neighbourhood can be painted, so render just that region
+        scene_size = self.sceneRect().size().toSize()
+        stroke_rect = self.current_paint_path.boundingRect()
+        left = max(0, int(np.floor(stroke_rect.left())) - 1)
+        top = max(0, int(np.floor(stroke_rect.top())) - 1)
+        right = min(scene_size.width(), int(np.ceil(stroke_rect.right())) + 2)
+        bottom = min(scene_size.height(), int(np.ceil(stroke_rect.bottom())) + 2)
 
         foreground_points = []
-        for x in range(mask.width()):
-            for y in range(mask.height()):
-                if mask.pixelColor(x, y) == QColor(255, 255, 255):
-                    if self.items():
-                        item = self.items()[-1]
-                        scene_pos = item.mapToScene(QPointF(x, y))
-                        foreground_points.append(scene_pos)
+        items = self.items()
+        if items and right > left and bottom > top:
+            mask = QImage(right - left, bottom - top, QImage.Format.Format_Grayscale8)
+            mask.fill(Qt.GlobalColor.transparent)
+
+            painter = QPainter(mask)
+            painter.translate(-left, -top)
+            painter.setPen(QPen(Qt.GlobalColor.white))
+            painter.setBrush(QBrush(Qt.GlobalColor.white))
+            painter.drawPath(self.current_paint_path)
+            painter.end()
+
+            item = items[-1]
+            # The outline of the painted area is enough for a prompt: it holds the extreme
+            # pixels that define the stroke's bounding box, at a fraction of the pixel count
+            mask_array = np.ascontiguousarray(self.qimage_to_mask_array(mask))
+            contours, _ = cv2.findContours(mask_array, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            if contours:
+                outline = np.concatenate(contours).reshape(-1, 2) + (left, top)
+                # Sub-sample very long outlines, segmentation does not need one prompt per
+                # pixel, but keep the extreme points so the bounding box is preserved
+                stride = max(1, int(np.ceil(len(outline) / PAINT_MAX_POINTS)))
+                keep = np.zeros(len(outline), dtype=bool)
+                keep[::stride] = True
+                keep[np.argmin(outline, axis=0)] = True
+                keep[np.argmax(outline, axis=0)] = True
+                # Map all points to the scene with a single polygon call; iterating a QPolygonF
+                # yields views into its storage, so copy the points while it is alive
+                mapped_points = item.mapToScene(self.array_to_qpolygonf(outline[keep]))
+                foreground_points = [QPointF(point) for point in mapped_points]
 
         # Emit signal for segmentation request
         self.segmentation_from_paint_data_requested.emit(foreground_points)
@@ -1254,8 +1505,9 @@ class ArtifactGraphicsScene(QGraphicsScene):
         # Only add point if it's significantly different from the last point (to avoid too many points)
         if self.freehand_points:
             last_point = self.freehand_points[-1]
-            distance = ((position.x() - last_point.x()) ** 2 + (position.y() - last_point.y()) ** 2) ** 0.5
-            if distance < 2.0:  # Skip points that are too close together
+            dx = position.x() - last_point.x()
+            dy = position.y() - last_point.y()
+            if dx * dx + dy * dy < 4.0:  # Skip points closer than 2 px, compared squared
                 return
         
         self.freehand_points.append(position)
@@ -1275,38 +1527,16 @@ class ArtifactGraphicsScene(QGraphicsScene):
             self.freehand_item = None
         
         # Apply slight smoothing to reduce jaggedness while preserving all points
-        # Use a simple moving average filter to smooth coordinates without reducing point count
-        if len(self.freehand_points) < 3:
-            smoothed_qpoints = [QPointF(p.x(), p.y()) for p in self.freehand_points]
-        else:
-            # Convert to numpy arrays for smoothing
-            x_coords = np.array([p.x() for p in self.freehand_points], dtype=np.float64)
-            y_coords = np.array([p.y() for p in self.freehand_points], dtype=np.float64)
-            
-            # Apply a simple moving average with a small window (3 points) for slight smoothing
-            # This preserves all points while reducing small jagged movements
-            window_size = 3
-            if len(x_coords) >= window_size:
-                # Pad the arrays to handle edges
-                x_padded = np.pad(x_coords, (window_size//2, window_size//2), mode='edge')
-                y_padded = np.pad(y_coords, (window_size//2, window_size//2), mode='edge')
-                
-                # Apply moving average
-                x_smoothed = np.convolve(x_padded, np.ones(window_size)/window_size, mode='valid')
-                y_smoothed = np.convolve(y_padded, np.ones(window_size)/window_size, mode='valid')
-                
-                # Convert back to QPointF list
-                smoothed_qpoints = [QPointF(float(x), float(y)) for x, y in zip(x_smoothed, y_smoothed)]
-            else:
-                # Not enough points for smoothing, use original points
-                smoothed_qpoints = [QPointF(p.x(), p.y()) for p in self.freehand_points]
-        
-        # Ensure the polygon is closed by adding the first point at the end if needed
-        if len(smoothed_qpoints) > 0 and smoothed_qpoints[0] != smoothed_qpoints[-1]:
-            smoothed_qpoints.append(smoothed_qpoints[0])
+        # Use a simple moving average with a small window (3 points), both axes at once
+        freehand_coords = self.qpolygonf_to_array(QPolygonF(self.freehand_points))
+        smoothed_coords = self.moving_average_coords(freehand_coords, window_size=3)
         
         # Create QPolygonF from smoothed points
-        polygon = QPolygonF(smoothed_qpoints)
+        polygon = self.array_to_qpolygonf(smoothed_coords)
+        
+        # Ensure the polygon is closed by adding the first point at the end if needed
+        if polygon.count() > 0 and polygon.first() != polygon.last():
+            polygon.append(QPointF(polygon.first()))
         
         # Emit signal to create the polygon artifact
         self.freehand_polygon_created.emit(polygon)
@@ -0,0 +1,71 @@
+import logging
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader
+from geospatial_handler import GeospatialHandler
+
+logger = logging.getLogger(__name__)
+
+class ImageLoadSignals(QObject):
+    # (load id, QImage, GeospatialHandler or None for a regular image)
+    loaded = pyqtSignal(int, QImage, object)
+
+class ImageLoadWorker(QRunnable):
+    """Decode an image file on a QThreadPool thread.
+
+    Only QImage is produced here: QPixmap must be created on the GUI thread,
+    which happens in the slot connected to signals.loaded.
+    """
+
+    def __init__(self, load_id, file_path):
+        super().__init__()
+        self.load_id = load_id
+        self.file_path = file_path
+        self.signals = ImageLoadSignals()
+
+    def run(self):
+        image = None
+        handler = None
+        if self.file_path.lower().endswith(('.tif', '.tiff')):
+            logger.debug("File is a GeoTIFF, attempting to load with GDAL...")
+            try:
+                handler = GeospatialHandler()
+                # No parent widget: dialogs are left to the GUI thread
+                image = self.geotiff_to_qimage(handler.load_geotiff(self.file_path))
+                logger.debug("Successfully loaded GeoTIFF with GDAL")
+                logger.debug("Transform: %s", handler.transform)
+                logger.debug("CRS: %s", handler.crs)
+            except Exception as e:
+                logger.error("Error loading GeoTIFF: %s", e)
+                # Fall back to regular image loading
+                logger.debug("Falling back to regular image loading")
+                handler = None
+        else:
+            logger.debug("File is not a GeoTIFF, loading as regular image")
+
+        if image is None:
+            reader = QImageReader(self.file_path)
+            image = reader.read()
+            if image.isNull():
+                logger.error("Could not read image %s: %s", self.file_path, reader.errorString())
+            image = to_pixmap_format(image)
+        self.signals.loaded.emit(self.load_id, image, handler)
+
+    @staticmethod
+    def geotiff_to_qimage(image_array):
+        height, width = image_array.shape[:2]  # Get height and width from first two dimensions
+        if len(image_array.shape) == 3:  # RGB image
+            image_format = QImage.Format.Format_RGB888
+            bytes_per_line = width * 3
+        else:  # Grayscale image
+            image_format = QImage.Format.Format_Grayscale8
+            bytes_per_line = width
+        # The converted QImage owns its pixels, so the array can be released
+        # when run() returns
+        return to_pixmap_format(QImage(image_array.data, width, height, bytes_per_line, image_format))
+
+def to_pixmap_format(image):
+    """Convert image to the format QPixmap stores, so QPixmap.fromImage() on the
+    GUI thread does not have to (about 0.12 s for a 7000x6000 RGB888 image)."""
+    if image.hasAlphaChannel():
+        return image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+    return image.convertToFormat(QImage.Format.Format_RGB32)
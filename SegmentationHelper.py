@@ -1,29 +1,92 @@
 import torch
 import numpy as np
 import os
+import hashlib
+import contextlib
+import threading
+from collections import OrderedDict
 from segment_anything import sam_model_registry, SamPredictor, SamAutomaticMaskGenerator
 
 basedir = os.path.dirname(__file__)
 
+# Number of images whose SAM embeddings are kept for reuse
+EMBEDDING_CACHE_SIZE = 4
+# Checkpoint file of each supported SAM model type, expected next to this file
+SAM_CHECKPOINTS = {
+    "vit_h": "sam_vit_h_4b8939.pth",
+    "vit_l": "sam_vit_l_0b3195.pth",
+    "vit_b": "sam_vit_b_01ec64.pth",
+}
+# Smaller model used for interactive prompts when its checkpoint is available
+INTERACTIVE_MODEL_TYPE = "vit_b"
+
+# Loaded SAM models by (model type, device); every loaded image gets new helpers, and
+# sharing the models means each checkpoint is read, and compiled, once per process
+_sam_models = {}
+# Held while a model is loaded and compiled, so helpers created on several threads
+# at once wait for the first load instead of repeating it
+_sam_models_lock = threading.Lock()
+
+def load_sam_model(model_type, checkpoint, device, inference_context):
+    """Return the SAM model of the given type, loading it on first use.
+
+    On CUDA the image encoder is compiled with torch.compile and warmed up under
+    inference_context; the eager encoder is kept if compilation is not available.
+    """
+    key = (model_type, str(device))
+    with _sam_models_lock:
+        if key in _sam_models:
+            return _sam_models[key]
+
+        sam = sam_model_registry[model_type](checkpoint=checkpoint)
+        sam.to(device=device)
+        if device.type == 'cuda' and hasattr(torch, 'compile'):
+            encoder = sam.image_encoder
+            try:
+                sam.image_encoder = torch.compile(encoder)
+                # Compilation happens on the first call, so trigger it here where a failure can fall back
+                with torch.no_grad(), inference_context():
+                    sam.image_encoder(torch.zeros(1, 3, encoder.img_size, encoder.img_size, device=device))
+            except Exception as e:
+                print(f"Could not compile the SAM image encoder, using eager mode: {str(e)}")
+                sam.image_encoder = encoder
+        _sam_models[key] = sam
+        return sam
+
 class SegmentationHelper:
-    def __init__(self):
+    # Shared between helpers: every loaded image gets a new helper, so a per-instance
+    # cache would never be hit when the same image is loaded again
+    _embedding_cache = OrderedDict()
+    # Helpers of different images run on different threads; guards every cache access
+    _embedding_cache_lock = threading.Lock()
+
+    def __init__(self, model_type="vit_h"):
         # Initialize SAM - you'll need to download the model checkpoint
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        model_type = "vit_h"
-        sam_checkpoint = os.path.join(basedir, "sam_vit_h_4b8939.pth")
+        sam_checkpoint = os.path.join(basedir, SAM_CHECKPOINTS[model_type])
+        if not os.path.exists(sam_checkpoint) and model_type != "vit_h":
+            print(f"Checkpoint for {model_type} not found, falling back to vit_h")
+            model_type = "vit_h"
+            sam_checkpoint = os.path.join(basedir, SAM_CHECKPOINTS[model_type])
+        self.model_type = model_type
+        # Half-precision autocast pays off on GPUs with tensor cores (compute capability 7.0+);
+        # float16 rather than bfloat16 because the predictor hands its scores to numpy
+        self.use_autocast = self.device.type == 'cuda' and torch.cuda.get_device_capability(self.device)[0] >= 7
         
-        sam = sam_model_registry[model_type](checkpoint=sam_checkpoint)
-        sam.to(device=self.device)
+        sam = load_sam_model(model_type, sam_checkpoint, self.device, self.inference_context)
         self.mask_generator = SamAutomaticMaskGenerator(sam)
         self.predictor = SamPredictor(sam)
+        # Print diagnostics about loaded images; these cost extra passes over the pixels
+        self.verbose = False
 
     def load_image(self, image):
         try:
-            print("Starting load_image method...")
-            print(f"Calculating image embeddings...")
-            print(f"Image shape: {image.shape}")
-            print(f"Image type: {type(image)}")
-            print(f"Image dtype: {image.dtype}")
+            if self.verbose:
+                print("Starting load_image method...")
+                print(f"Calculating image embeddings...")
+                print(f"Image shape: {image.shape}")
+                print(f"Image type: {type(image)}")
+                print(f"Image dtype: {image.dtype}")
             
             # Add defensive checks
             if not isinstance(image, np.ndarray):
@@ -31,6 +94,9 @@ class SegmentationHelper:
             
             if image.dtype != np.uint8:
                 print(f"Converting image from {image.dtype} to uint8")
+                if np.issubdtype(image.dtype, np.floating):
+                    # NaN and Inf have no uint8 value, replace them before converting
+                    image = np.nan_to_num(image, nan=0, posinf=255, neginf=0)
                 image = image.astype(np.uint8)
             
             if len(image.shape) != 3:
@@ -41,37 +107,18 @@ class SegmentationHelper:
             
             # Ensure the image is contiguous in memory
             if not image.flags['C_CONTIGUOUS']:
-                print("Making image contiguous in memory...")
+                if self.verbose:
+                    print("Making image contiguous in memory...")
                 image = np.ascontiguousarray(image)
             
-            # Check for NaN or Inf values
-            if np.isnan(image).any():
-                print("Warning: Image contains NaN values")
-                image = np.nan_to_num(image, nan=0)
-            
-            if np.isinf(image).any():
-                print("Warning: Image contains Inf values")
-                image = np.clip(image, 0, 255)
-            
-            print("About to calculate min/max values...")
-            try:
-                min_val = np.min(image)
-                max_val = np.max(image)
-                print(f"Image min/max values: {min_val}/{max_val}")
-            except Exception as e:
-                print(f"Error calculating min/max: {str(e)}")
-                print("Continuing without min/max check...")
+            if self.verbose:
+                # Full passes over the image, only worth paying for when diagnosing
+                print(f"Image min/max values: {np.min(image)}/{np.max(image)}")
 
-            print("About to call set_image...")
             try:
-                print("Starting set_image call...")
-                # Add a small delay to ensure everything is properly loaded
-                import time
-                time.sleep(0.1)
-                
-                self.predictor.set_image(image)
-                print("set_image call completed")
-                print("Image set successfully")
+                self.set_image_cached(image)
+                if self.verbose:
+                    print("Image set successfully")
             except Exception as e:
                 print(f"Error setting image: {str(e)}")
                 print(f"Error type: {type(e)}")
@@ -82,9 +129,7 @@ class SegmentationHelper:
                 print("Caught non-Exception error (likely a segmentation fault)")
                 raise
 
-            print("About to store image in self.image")
             self.image = image
-            print("Image stored successfully")
             
         except Exception as e:
             print(f"Error in load_image: {str(e)}")
@@ -96,6 +141,35 @@ class SegmentationHelper:
             print("Caught non-Exception error in load_image (likely a segmentation fault)")
             raise
 
+    def inference_context(self):
+        """Context for SAM calls: float16 autocast on tensor-core GPUs, plain float32 otherwise."""
+        if self.use_autocast:
+            return torch.autocast('cuda', dtype=torch.float16)
+        return contextlib.nullcontext()
+
+    def set_image_cached(self, image):
+        """Set the predictor image, reusing the embeddings computed for an identical image."""
+        # Hash the whole image: a sampled fingerprint could hand back another image's embeddings
+        key = (self.model_type, image.shape, hashlib.blake2b(image.data, digest_size=16).digest())
+        with self._embedding_cache_lock:
+            cached = self._embedding_cache.get(key)
+            if cached is not None:
+                self._embedding_cache.move_to_end(key)
+        if cached is not None:
+            print("Reusing cached image embeddings")
+            self.predictor.reset_image()
+            self.predictor.features, self.predictor.original_size, self.predictor.input_size = cached
+            self.predictor.is_image_set = True
+            return
+
+        with self.inference_context():
+            self.predictor.set_image(image)
+        with self._embedding_cache_lock:
+            self._embedding_cache[key] = (self.predictor.features, self.predictor.original_size, self.predictor.input_size)
+            # Drop the least recently used embeddings to bound GPU memory
+            while len(self._embedding_cache) > EMBEDDING_CACHE_SIZE:
+                self._embedding_cache.popitem(last=False)
+
     def generate_all_masks(self, progress_callback=None):
         print(f"Generating all masks...")
         # Convert QPixmap to numpy array
@@ -104,7 +178,8 @@ class SegmentationHelper:
         
         try:
             # Generate masks
-            masks = self.mask_generator.generate(self.image)
+            with self.inference_context():
+                masks = self.mask_generator.generate(self.image)
             
             if progress_callback:
                 progress_callback(80)  # SAM processing complete
@@ -148,11 +223,12 @@ class SegmentationHelper:
         input_point = np.array([[x, y]])
         input_label = np.array([1])  # 1 indicates foreground
         
-        masks, scores, logits = self.predictor.predict(
-            point_coords=input_point,
-            point_labels=input_label,
-            multimask_output=True
-        )
+        with self.inference_context():
+            masks, scores, logits = self.predictor.predict(
+                point_coords=input_point,
+                point_labels=input_label,
+                multimask_output=True
+            )
 
         if progress_callback:
             progress_callback(80)
@@ -170,22 +246,16 @@ class SegmentationHelper:
         if progress_callback:
             progress_callback(10)
         
-        # Convert painting points from scene coordinates to image coordinates if necessary
-        painting_points_image_coords = []
-        for point in painting_points:
-            x, y = int(point[0]), int(point[1])
-            
-            # Ensure the point is within the image bounds
+        # Convert painting points from scene coordinates to image coordinates if necessary;
+        # astype(int) truncates toward zero like int() does
+        painting_points_image_coords = np.array(painting_points, dtype=np.float64).reshape(-1, 2).astype(int)
+
+        if len(painting_points_image_coords):
+            # Ensure the points are within the image bounds
             height, width, _ = self.image.shape
-            x = max(0, min(x, width - 1))
-            y = max(0, min(y, height - 1))
-            painting_points_image_coords.append([x, y])
-
-        if painting_points_image_coords:
-            min_x = min(point[0] for point in painting_points_image_coords)
-            max_x = max(point[0] for point in painting_points_image_coords)
-            min_y = min(point[1] for point in painting_points_image_coords)
-            max_y = max(point[1] for point in painting_points_image_coords)
+            np.clip(painting_points_image_coords, 0, [width - 1, height - 1], out=painting_points_image_coords)
+            min_x, min_y = painting_points_image_coords.min(axis=0)
+            max_x, max_y = painting_points_image_coords.max(axis=0)
             bounding_box = np.array([min_x, min_y, max_x, max_y])
         else:
             bounding_box = np.array([0, 0, 0, 0])
@@ -196,10 +266,11 @@ class SegmentationHelper:
         # Use SAM to generate mask from painting points prompt
         input_box = np.array(bounding_box)
         
-        masks, scores, logits = self.predictor.predict(
-            box=input_box,
-            multimask_output=True
-        )
+        with self.inference_context():
+            masks, scores, logits = self.predictor.predict(
+                box=input_box,
+                multimask_output=True
+            )
 
         if progress_callback:
             progress_callback(80)
@@ -215,18 +286,24 @@ class SegmentationHelper:
         if progress_callback:
             progress_callback(10)
         
-        # Convert points to numpy arrays
-        input_points = np.array(foreground_points + background_points)
-        input_labels = np.array([1] * len(foreground_points) + [0] * len(background_points))
+        # Convert points to numpy arrays, filling one preallocated array per prompt part
+        num_foreground = len(foreground_points)
+        num_points = num_foreground + len(background_points)
+        input_points = np.empty((num_points, 2), dtype=np.float32)
+        input_points[:num_foreground] = np.asarray(foreground_points, dtype=np.float32).reshape(-1, 2)
+        input_points[num_foreground:] = np.asarray(background_points, dtype=np.float32).reshape(-1, 2)
+        input_labels = np.zeros(num_points, dtype=np.int32)
+        input_labels[:num_foreground] = 1
         
         try:
             # Use SAM to generate mask with both points and bounding box
-            masks, scores, logits = self.predictor.predict(
-                point_coords=input_points,
-                point_labels=input_labels,
-                box=np.array(bounding_box) if bounding_box else None,
-                multimask_output=False
-            )
+            with self.inference_context():
+                masks, scores, logits = self.predictor.predict(
+                    point_coords=input_points,
+                    point_labels=input_labels,
+                    box=np.array(bounding_box) if bounding_box else None,
+                    multimask_output=False
+                )
 
             if progress_callback:
                 progress_callback(80)
@@ -245,3 +322,4 @@ class SegmentationHelper:
             if progress_callback:
                 progress_callback(0)  # Reset progress on error
             raise e
+
@@ -1,7 +1,8 @@
+import threading
 import numpy as np
 from PyQt6.QtCore import QThread, pyqtSignal
-from PyQt6.QtGui import QImage
-from SegmentationHelper import SegmentationHelper
+from PyQt6.QtGui import QImage, QPixmap
+from SegmentationHelper import SegmentationHelper, INTERACTIVE_MODEL_TYPE
 
 class MaskGenerationService(QThread):
     progress_updated = pyqtSignal(int)
@@ -10,21 +11,33 @@ class MaskGenerationService(QThread):
     def __init__(self, pixmap):
         super().__init__()
         self.pixmap = pixmap
-        self.segmentation_helper = SegmentationHelper()
-        self.segmentation_helper.image = make_np_array(pixmap)
+        # QPixmap may only be touched on the GUI thread, QImage is safe to
+        # hand over to run()
+        self.image = pixmap.toImage() if pixmap is not None else None
+        # Created in run(): loading, and on CUDA compiling, the model must not
+        # block the GUI thread
+        self.segmentation_helper = None
 
     def run(self):
         """This method is called when the thread starts"""
         if self.pixmap is None:
             raise ValueError("Pixmap should not be none")
         try:
+            if self.segmentation_helper is None:
+                self.segmentation_helper = SegmentationHelper()
+            # Convert here rather than in __init__ so the copy of a large
+            # image does not block the GUI thread
+            self.segmentation_helper.image = make_np_array(self.image)
+            self.progress_updated.emit(1)
+            
             masks = self.segmentation_helper.generate_all_masks(
                 progress_callback=self.progress_updated.emit
             )
             
             # Emit signals in the correct order
+            # Both signals are queued to the GUI thread, which handles them in
+            # emission order
             self.progress_updated.emit(100)  # First emit 100% progress
-            QThread.msleep(100)  # Give Qt time to process the progress update
             self.segmentation_complete.emit(masks)  # Then emit completion
             self.finished.emit()  # Finally signal thread completion
         except Exception as e:
@@ -45,8 +58,19 @@ class SegmentationFromPromptService(QThread):
     def __init__(self, pixmap):
         super().__init__()
         self.pixmap = pixmap
-        self.segmentation_helper = SegmentationHelper()
-        self.segmentation_helper.load_image(make_np_array(pixmap))
+        self.image = pixmap.toImage() if pixmap is not None else None
+        # The model is loaded and the image embedded by encode(), which the
+        # caller runs on a pool thread instead of blocking the GUI here
+        self.segmentation_helper = None
+        self.image_loaded = False
+        # Held for the embedding and for every predictor call; reentrant so a
+        # caller holding it can still go through ensure_image_loaded()
+        self.image_lock = threading.RLock()
+        # Set once a newer image replaced this one, so a queued encode is skipped
+        self.cancelled = False
+        # Last preview requested before the embedding was ready, run by encode()
+        self.pending_preview_prompt = None
+        self.pending_preview_lock = threading.Lock()
         
         # Store parameters for the run method
         self.point_prompt = None
@@ -62,35 +86,38 @@ class SegmentationFromPromptService(QThread):
             # Emit initial progress immediately
             self.progress_updated.emit(1)
             
-            if self.points_prompt:
-                foreground_points, background_points = self.points_prompt
-                masks = self.segmentation_helper.generate_mask_with_points(
-                    foreground_points,
-                    background_points,
-                    progress_callback=self.progress_updated.emit,
-                    bounding_box=self.bounding_box
-                )
-            elif self.point_prompt:
-                masks = self.segmentation_helper.generate_masks_from_point(
-                    self.point_prompt,
-                    progress_callback=self.progress_updated.emit
-                )
-            elif self.painting_prompt:
-                masks = self.segmentation_helper.generate_masks_from_painting(
-                    self.painting_prompt,
-                    progress_callback=self.progress_updated.emit
-                )
-            else:
-                masks = self.segmentation_helper.generate_all_masks(
-                    progress_callback=self.progress_updated.emit
-                )
+            # SamPredictor is not thread-safe: previews may run on the GUI thread
+            # and on the encode thread while this one segments
+            with self.image_lock:
+                self.ensure_image_loaded()
+                
+                if self.points_prompt:
+                    foreground_points, background_points = self.points_prompt
+                    masks = self.segmentation_helper.generate_mask_with_points(
+                        foreground_points,
+                        background_points,
+                        progress_callback=self.progress_updated.emit,
+                        bounding_box=self.bounding_box
+                    )
+                elif self.point_prompt:
+                    masks = self.segmentation_helper.generate_masks_from_point(
+                        self.point_prompt,
+                        progress_callback=self.progress_updated.emit
+                    )
+                elif self.painting_prompt:
+                    masks = self.segmentation_helper.generate_masks_from_painting(
+                        self.painting_prompt,
+                        progress_callback=self.progress_updated.emit
+                    )
+                else:
+                    masks = self.segmentation_helper.generate_all_masks(
+                        progress_callback=self.progress_updated.emit
+                    )
             
-            # Emit final progress and wait for it to be processed
+            # Emit final progress; it is queued ahead of the completion signal,
+            # so the GUI thread handles it first
             self.progress_updated.emit(100)
             
-            # Give Qt time to process the progress update
-            QThread.msleep(100)
-            
             # Now emit the completion signal
             self.segmentation_complete.emit(masks)
             
@@ -111,45 +138,93 @@ class SegmentationFromPromptService(QThread):
         # Start the thread
         self.start()
         
+    def ensure_image_loaded(self):
+        """Load the model, convert the image and compute its embedding if not done yet."""
+        with self.image_lock:
+            if not self.image_loaded:
+                if self.segmentation_helper is None:
+                    # Prompts need a fast encoder more than the last bit of mask quality
+                    self.segmentation_helper = SegmentationHelper(model_type=INTERACTIVE_MODEL_TYPE)
+                self.segmentation_helper.load_image(make_np_array(self.image))
+                self.image_loaded = True
+
+    def is_ready(self):
+        """Whether prompts can be answered without running the image encoder."""
+        return self.image_loaded
+
+    def cancel(self):
+        """Skip the encode if it has not started yet; an encode already running finishes."""
+        self.cancelled = True
+
+    def encode(self):
+        """Embed the image ahead of the first prompt; meant for a pool thread."""
+        if self.image is None or self.cancelled:
+            return
+        try:
+            self.ensure_image_loaded()
+        except Exception as e:
+            print(f"Error encoding image in SegmentationFromPromptService: {str(e)}")
+            return
+        with self.pending_preview_lock:
+            point_prompt = self.pending_preview_prompt
+            self.pending_preview_prompt = None
+        if point_prompt is not None and not self.cancelled:
+            self.preview_segmentation(point_prompt)
+
     def preview_segmentation(self, point_prompt):
         if self.pixmap is None:
             raise ValueError("Pixmap should not be none")
+        with self.pending_preview_lock:
+            if not self.image_loaded:
+                # Running the encoder here would freeze the GUI; keep only the
+                # latest hover position for encode() to preview once it is done
+                self.pending_preview_prompt = point_prompt
+                return
         try:
-            mask = self.segmentation_helper.generate_masks_from_point(
-                point_prompt
-            )[0]
+            with self.image_lock:
+                mask = self.segmentation_helper.generate_masks_from_point(
+                    point_prompt
+                )[0]
             
             self.segmentation_preview_complete.emit(mask)
         except Exception as e:
             print(f"Error in SegmentationFromPromptService preview: {str(e)}")
             raise e
         
+# The last converted image as {QImage cache key: array}. Every detect-all run
+# and the prompt service convert the same loaded image, so they share one
+# array; opening another image replaces the entry. Callers must not modify it.
+_np_array_cache = {}
+
 def make_np_array(pixmap):
     try:
         print("Starting image conversion...")
-        image = pixmap.toImage()
+        image = pixmap.toImage() if isinstance(pixmap, QPixmap) else pixmap
+        key = image.cacheKey()
+        cached = _np_array_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        # RGB888 is laid out R, G, B in memory on every platform, unlike
+        # RGB32 which is B, G, R, A on little-endian machines, and has no
+        # alpha byte to strip afterwards
+        if image.format() != QImage.Format.Format_RGB888:
+            image = image.convertToFormat(QImage.Format.Format_RGB888)
         width = image.width()
         height = image.height()
         print(f"Image dimensions: {width}x{height}")
         
-        # Ensure the image is in the correct format
-        if image.format() != QImage.Format.Format_RGB32:
-            print("Converting image to RGB32 format...")
-            image = image.convertToFormat(QImage.Format.Format_RGB32)
-        
-        ptr = image.bits()
-        ptr.setsize(height * width * 4)
-        
-        print("Creating numpy array...")
-        # Create a copy of the data to ensure it's contiguous
-        arr = np.frombuffer(ptr, np.uint8).copy().reshape((height, width, 4))
-        print("Array created, shape:", arr.shape)
+        ptr = image.constBits()
+        ptr.setsize(image.sizeInBytes())
         
-        # Remove alpha channel and ensure we have a contiguous array
-        arr = np.ascontiguousarray(arr[:, :, :3])
+        # View the pixels in place (rows are padded to a multiple of 4 bytes);
+        # the view dies with the QImage, so copy it out as one contiguous array
+        rows = np.frombuffer(ptr, np.uint8).reshape((height, image.bytesPerLine()))
+        arr = np.ascontiguousarray(rows[:, :width * 3].reshape((height, width, 3)))
         print("Final array shape:", arr.shape)
-        print("Array is contiguous:", arr.flags['C_CONTIGUOUS'])
         
+        _np_array_cache.clear()
+        _np_array_cache[key] = arr
         return arr
     except Exception as e:
         print(f"Error in make_np_array: {str(e)}")
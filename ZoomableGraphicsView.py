@@ -1,6 +1,24 @@
-from PyQt6.QtWidgets import QGraphicsView, QStyleOptionGraphicsItem, QApplication
-from PyQt6.QtCore import Qt, QEvent, QPointF
-from PyQt6.QtGui import QWheelEvent, QPainter, QResizeEvent, QMouseEvent, QKeyEvent
+from PyQt6.QtWidgets import QGraphicsView, QApplication, QWidget
+from PyQt6.QtCore import Qt, QEvent, QPointF, QTimer
+from PyQt6.QtGui import QWheelEvent, QPainter, QResizeEvent, QMouseEvent, QKeyEvent, QSurfaceFormat, QOpenGLContext
+
+try:
+    from PyQt6.QtOpenGLWidgets import QOpenGLWidget
+except ImportError:
+    QOpenGLWidget = None
+
+# Images larger than this are left on the raster viewport: the OpenGL paint
+# engine downscales pixmaps that exceed the GPU's maximum texture size
+OPENGL_MAX_IMAGE_SIZE = 8192
+
+_opengl_available = None
+
+def opengl_available():
+    """Whether an OpenGL context can be created on this platform (checked once)."""
+    global _opengl_available
+    if _opengl_available is None:
+        _opengl_available = QOpenGLWidget is not None and QOpenGLContext().create()
+    return _opengl_available
 
 class ZoomableGraphicsView(QGraphicsView):
     def __init__(self, *args, **kwargs):
@@ -15,6 +33,51 @@ class ZoomableGraphicsView(QGraphicsView):
         self.base_scale = 1.0
         self.last_pos = QPointF()
 
+        # Middle mouse button panning state
+        self.pan_active = False
+        self.pan_last_pos = QPointF()
+        self.pan_previous_cursor = None
+
+        # Label visibility is refreshed at most once per frame (~16 ms), however
+        # many wheel, pinch, scroll or resize events arrive in between
+        self.label_update_timer = QTimer(self)
+        self.label_update_timer.setSingleShot(True)
+        self.label_update_timer.setInterval(16)
+        self.label_update_timer.timeout.connect(self.update_label_visibility)
+
+    def use_opengl_viewport(self, enabled):
+        """Switch between an OpenGL and a raster viewport, return whether OpenGL is used."""
+        enabled = enabled and opengl_available()
+        currently_enabled = QOpenGLWidget is not None and isinstance(self.viewport(), QOpenGLWidget)
+        if enabled == currently_enabled:
+            return enabled
+        
+        if enabled:
+            viewport = QOpenGLWidget()
+            surface_format = QSurfaceFormat()
+            surface_format.setSamples(4)
+            viewport.setFormat(surface_format)
+            # A GL viewport redraws from scratch anyway, so skip the region bookkeeping
+            update_mode = QGraphicsView.ViewportUpdateMode.FullViewportUpdate
+        else:
+            viewport = QWidget()
+            update_mode = QGraphicsView.ViewportUpdateMode.MinimalViewportUpdate
+        
+        # setViewport() replaces the widget, so its attributes must be set again
+        self.setViewport(viewport)
+        self.viewport().setAttribute(Qt.WidgetAttribute.WA_AcceptTouchEvents)
+        self.setViewportUpdateMode(update_mode)
+        return enabled
+
+    def schedule_label_update(self):
+        """Refresh label visibility on the next timer tick."""
+        if not self.label_update_timer.isActive():
+            self.label_update_timer.start()
+
+    def update_label_visibility(self):
+        if self.scene():
+            self.scene().update_label_visibility()
+
     def wheelEvent(self, event: QWheelEvent):
         # Determine whether the user is scrolling up or down
         if event.angleDelta().y() > 0:  # Scroll up
@@ -22,20 +85,11 @@ class ZoomableGraphicsView(QGraphicsView):
         else:  # Scroll down
             zoom = 1 / self.zoom_factor
 
-        # Get the current position of the cursor relative to the scene
-        cursor_scene_pos = self.mapToScene(event.position().toPoint())
-        
-        # Apply scaling
-        self.scale(zoom, zoom)
-        
-        # Adjust view to keep the cursor position consistent
-        cursor_view_pos = self.mapFromScene(cursor_scene_pos)
-        self.translate(cursor_view_pos.x() - event.position().x(),
-                       cursor_view_pos.y() - event.position().y())
+        # Zoom around the cursor
+        self.zoom_at(zoom, event.position().toPoint())
         
         # Update label visibility based on zoom
-        if self.scene():
-            self.scene().update_label_visibility()
+        self.schedule_label_update()
         
     def event(self, event):
         if event.type() == QEvent.Type.Gesture:
@@ -73,8 +127,7 @@ class ZoomableGraphicsView(QGraphicsView):
                 self.last_pos = center
                 
                 # Update label visibility based on zoom
-                if self.scene():
-                    self.scene().update_label_visibility()
+                self.schedule_label_update()
             
             return True
         return False
@@ -82,118 +135,81 @@ class ZoomableGraphicsView(QGraphicsView):
     def reset_view(self):
         # Update the reset_view method to reset the scale tracking
         self.current_scale = 1.0
-        self.last_pinch_scale = 1.0
         self.resetTransform()
         self.fitInView(self.scene().sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
         # Update label visibility based on zoom
-        if self.scene():
-            self.scene().update_label_visibility()
+        self.schedule_label_update()
+
+    def zoom_at(self, zoom, view_pos):
+        """Scale the view by zoom, keeping the scene point under view_pos in place."""
+        anchor_scene_pos = self.mapToScene(view_pos)
+        self.scale(zoom, zoom)
+        
+        # The scroll bars own the view's translation (translate() has no
+        # visible effect on a scrollable view), so shift them instead
+        offset = self.mapFromScene(anchor_scene_pos) - view_pos
+        self.horizontalScrollBar().setValue(self.horizontalScrollBar().value() + offset.x())
+        self.verticalScrollBar().setValue(self.verticalScrollBar().value() + offset.y())
 
     def zoom_in(self):
         """Zoom in by the zoom factor."""
-        # Get the center of the viewport
-        center = self.viewport().rect().center()
-        cursor_scene_pos = self.mapToScene(center)
-        
-        # Apply scaling
-        self.scale(self.zoom_factor, self.zoom_factor)
-        
-        # Adjust view to keep the center position consistent
-        cursor_view_pos = self.mapFromScene(cursor_scene_pos)
-        self.translate(cursor_view_pos.x() - center.x(),
-                      cursor_view_pos.y() - center.y())
+        # Keep the center of the viewport in place
+        self.zoom_at(self.zoom_factor, self.viewport().rect().center())
         
         # Update label visibility based on zoom
-        if self.scene():
-            self.scene().update_label_visibility()
+        self.schedule_label_update()
 
     def zoom_out(self):
         """Zoom out by the inverse of the zoom factor."""
-        # Get the center of the viewport
-        center = self.viewport().rect().center()
-        cursor_scene_pos = self.mapToScene(center)
-        
-        # Apply scaling
-        self.scale(1 / self.zoom_factor, 1 / self.zoom_factor)
-        
-        # Adjust view to keep the center position consistent
-        cursor_view_pos = self.mapFromScene(cursor_scene_pos)
-        self.translate(cursor_view_pos.x() - center.x(),
-                      cursor_view_pos.y() - center.y())
+        # Keep the center of the viewport in place
+        self.zoom_at(1 / self.zoom_factor, self.viewport().rect().center())
         
         # Update label visibility based on zoom
-        if self.scene():
-            self.scene().update_label_visibility()
+        self.schedule_label_update()
     
     def scrollContentsBy(self, dx, dy):
         """Override to update labels when view is panned"""
         super().scrollContentsBy(dx, dy)
         # Update label visibility when viewport changes
-        if self.scene():
-            self.scene().update_label_visibility()
+        self.schedule_label_update()
     
     def resizeEvent(self, event: QResizeEvent):
         """Override to update labels when view is resized"""
         super().resizeEvent(event)
         # Update label visibility when viewport size changes
-        if self.scene():
-            self.scene().update_label_visibility()
-    
-    def drawItems(self, painter, items, options):
-        """Override to prevent drawing selection rectangles for node handles."""
-        from editable_polygon_item import NodeHandle, TangentHandle
-        # Filter out selection rectangles for node handles
-        for i, option in enumerate(options):
-            if isinstance(items[i], (NodeHandle, TangentHandle)):
-                # Remove selection state from the option to prevent rectangle drawing
-                option.state &= ~QStyleOptionGraphicsItem.StateFlag.StateSelected
-        super().drawItems(painter, items, options)
+        self.schedule_label_update()
     
     def mousePressEvent(self, event: QMouseEvent):
-        """Handle mouse press for panning with middle mouse button in edit mode."""
-        # Allow middle mouse button to pan even when drag mode is NoDrag
+        """Start panning with the middle mouse button, whatever the drag mode."""
         if event.button() == Qt.MouseButton.MiddleButton:
-            # Temporarily enable ScrollHandDrag for panning
-            old_drag_mode = self.dragMode()
-            self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
-            # Translate middle button to left button for panning
-            translated_event = QMouseEvent(
-                event.type(),
-                event.position(),
-                event.globalPosition(),
-                Qt.MouseButton.LeftButton,
-                Qt.MouseButton.LeftButton,
-                event.modifiers(),
-                event.source()
-            )
-            result = super().mousePressEvent(translated_event)
-            # Restore original drag mode after handling
-            self.setDragMode(old_drag_mode)
-            return result
+            self.pan_active = True
+            self.pan_last_pos = event.position()
+            self.pan_previous_cursor = self.viewport().cursor()
+            self.viewport().setCursor(Qt.CursorShape.ClosedHandCursor)
+            event.accept()
+            return
         super().mousePressEvent(event)
     
     def mouseMoveEvent(self, event: QMouseEvent):
-        """Handle mouse move for panning with middle mouse button."""
-        if event.buttons() & Qt.MouseButton.MiddleButton:
-            # Temporarily enable ScrollHandDrag for panning
-            old_drag_mode = self.dragMode()
-            self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
-            # Translate middle button to left button for panning
-            translated_event = QMouseEvent(
-                event.type(),
-                event.position(),
-                event.globalPosition(),
-                Qt.MouseButton.LeftButton,
-                event.buttons() & ~Qt.MouseButton.MiddleButton | Qt.MouseButton.LeftButton,
-                event.modifiers(),
-                event.source()
-            )
-            result = super().mouseMoveEvent(translated_event)
-            # Restore original drag mode after handling
-            self.setDragMode(old_drag_mode)
-            return result
+        """Pan by moving the scroll bars while the middle mouse button is held."""
+        if self.pan_active:
+            delta = event.position() - self.pan_last_pos
+            self.pan_last_pos = event.position()
+            self.horizontalScrollBar().setValue(self.horizontalScrollBar().value() - round(delta.x()))
+            self.verticalScrollBar().setValue(self.verticalScrollBar().value() - round(delta.y()))
+            event.accept()
+            return
         super().mouseMoveEvent(event)
     
+    def mouseReleaseEvent(self, event: QMouseEvent):
+        """Stop middle mouse button panning."""
+        if self.pan_active and event.button() == Qt.MouseButton.MiddleButton:
+            self.pan_active = False
+            self.viewport().setCursor(self.pan_previous_cursor)
+            event.accept()
+            return
+        super().mouseReleaseEvent(event)
+    
     def keyPressEvent(self, event: QKeyEvent):
         """Override to prevent arrow key scrolling in edit mode."""
         # Check if we're in edit mode by checking the scene
@@ -1,11 +1,13 @@
 from PyQt6.QtWidgets import QMainWindow, QWidget, QApplication, QToolBar, QFileDialog, QVBoxLayout, QLabel, QGraphicsView, QScroller, QPushButton, QDockWidget, QGraphicsPolygonItem, QSlider, QProgressBar, QTableWidget, QTableWidgetItem, QMessageBox
-from PyQt6.QtGui import QAction, QPixmap, QImage, QPainter, QPolygonF, QPen, QColor, QBrush, QKeySequence, QUndoStack
-from PyQt6.QtCore import Qt, QPointF
+from PyQt6.QtGui import QAction, QPixmap, QPixmapCache, QImage, QPainter, QPolygonF, QPen, QColor, QBrush, QKeySequence, QUndoStack
+from PyQt6.QtCore import Qt, QPointF, QThreadPool
 from viewer_mode import ViewerMode
 from ArtifactGraphicsScene import ArtifactGraphicsScene
-from ZoomableGraphicsView import ZoomableGraphicsView
+from ZoomableGraphicsView import ZoomableGraphicsView, OPENGL_MAX_IMAGE_SIZE
 from SegmentationWorker import SegmentationFromPromptService, MaskGenerationService
+from ImageLoadWorker import ImageLoadWorker
 from artifact_polygon_item import ArtifactPolygonItem
+from mipmapped_pixmap_item import MipmappedPixmapItem
 from editable_polygon_item import EditablePolygonItem
 from svg_exporter import export_scene_to_svg
 from geospatial_handler import GeospatialHandler
@@ -13,9 +15,15 @@ from geopackage_exporter import export_scene_to_geopackage
 from undo_commands import AddPolygonCommand, DeletePolygonCommand, ModifyPolygonCommand, ErasePolygonCommand, BatchCommand, ModifyAttributeCommand
 
 import numpy as np
+import os
 import sys
+import logging
 import cv2
 
+# Decoded images kept for reopening, in KB (Qt's default of 10 MB does not fit
+# one 4000x3000 photo)
+IMAGE_CACHE_LIMIT_KB = 512 * 1024
+
 class MainWindow(QMainWindow):
 
     def __init__(self):
@@ -39,6 +47,12 @@ class MainWindow(QMainWindow):
         # Track if a GeoTIFF is loaded
         self.is_geotiff_loaded = False
 
+        # Incremented for every image load; results of older loads are dropped
+        self.image_load_id = 0
+        self.image_load_signals = None
+        self.image_cache_key = None
+        QPixmapCache.setCacheLimit(IMAGE_CACHE_LIMIT_KB)
+
         # Track selected polygon
         self.selected_polygon = None
 
@@ -47,7 +61,14 @@ class MainWindow(QMainWindow):
 
         # Initialize segment_worker
         self.segment_worker = None
+        # Image embeddings are computed one at a time on their own thread, so a
+        # stale encode neither competes with a newer one nor with image decoding
+        # on the global pool
+        self.encode_pool = QThreadPool(self)
+        self.encode_pool.setMaxThreadCount(1)
         self.mask_gen_service = None
+        # Services of previous images kept alive until their threads finish
+        self.retired_services = []
 
         # Create toolbar
         self.toolbar = QToolBar()
@@ -259,8 +280,16 @@ class MainWindow(QMainWindow):
                     pass  # Ignore if the item was already deleted
                 self.preview_polygon = None
             
-            # Clear previous image
-            self.scene.clear()
+            # Clear previous image. Removing each selected polygon would emit
+            # selectionChanged once per item, so block signals and refresh
+            # the selection-dependent widgets once afterwards
+            self.scene.blockSignals(True)
+            try:
+                self.scene.clear()
+            finally:
+                self.scene.blockSignals(False)
+            self.update_delete_button()
+            self.handle_scene_selection_changed()
             
             # Clear undo stack when loading new image
             self.undo_stack.clear()
@@ -268,79 +297,122 @@ class MainWindow(QMainWindow):
             # Reset GeoTIFF flag
             self.is_geotiff_loaded = False
             
-            # Check if the file is a GeoTIFF
-            if file_path.lower().endswith(('.tif', '.tiff')):
-                print("File is a GeoTIFF, attempting to load with GDAL...")
-                try:
-                    # Load GeoTIFF and get its metadata
-                    image_array = self.geospatial_handler.load_geotiff(file_path, self)
-                    print("Successfully loaded GeoTIFF with GDAL")
-                    print(f"Transform: {self.geospatial_handler.transform}")
-                    print(f"CRS: {self.geospatial_handler.crs}")
-                    
-                    # Set GeoTIFF flag
-                    self.is_geotiff_loaded = True
-                    
-                    # Convert numpy array to QPixmap
-                    height, width = image_array.shape[:2]  # Get height and width from first two dimensions
-                    if len(image_array.shape) == 3:  # RGB image
-                        bytes_per_line = width * 3
-                        qimage = QImage(image_array.data, width, height, bytes_per_line, QImage.Format.Format_RGB888)
-                    else:  # Grayscale image
-                        bytes_per_line = width
-                        qimage = QImage(image_array.data, width, height, bytes_per_line, QImage.Format.Format_Grayscale8)
-                    self.pixmap = QPixmap.fromImage(qimage)
-                    
-                    # Debug CRS information
-                    print(f"CRS type: {type(self.geospatial_handler.crs)}")
-                    print(f"CRS string: {self.geospatial_handler.crs}")
-                    print(f"Transform type: {type(self.geospatial_handler.transform)}")
-                    print(f"Transform: {self.geospatial_handler.transform}")
-                    print("GeoPackage export button enabled")
-                except Exception as e:
-                    print(f"Error loading GeoTIFF: {str(e)}")
-                    # Fall back to regular image loading
-                    print("Falling back to regular image loading")
-                    self.pixmap = QPixmap(file_path)
-            else:
-                # Regular image loading
-                print("File is not a GeoTIFF, loading as regular image")
-                self.pixmap = QPixmap(file_path)
+            # Nothing may segment the previous image while the new one decodes
+            self.retire_segmentation_services()
+            self.pixmap = None
+            self.set_image_tools_enabled(False)
+            if self.current_mode != ViewerMode.NORMAL:
+                self.set_mode(ViewerMode.NORMAL)
             
-            # Add image to scene
-            self.scene.addPixmap(self.pixmap)
-            self.scene.setSceneRect(self.pixmap.rect().toRectF())
-            self.view.fitInView(self.scene.sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
-
-            # Enable buttons
-            self.reset_button.setEnabled(True)
-            self.detectAllBtn.setEnabled(True)
-            self.clickDetectBtn.setEnabled(True)
-            self.brushFillBtn.setEnabled(True)
-            self.eraserBtn.setEnabled(True)
-            self.freeHandBtn.setEnabled(True)
-            self.editModeBtn.setEnabled(True)
-
-            self.initialize_segmentation_service()
-            self.update_shape_count()
+            self.image_load_id += 1
+            
+            # Reopened regular images come from QPixmapCache. GeoTIFFs are not
+            # cached since their geospatial metadata is read along with the pixels
+            self.image_cache_key = None
+            if not file_path.lower().endswith(('.tif', '.tiff')) and os.path.exists(file_path):
+                # The modification time makes an edited file miss the cache
+                self.image_cache_key = f"{os.path.abspath(file_path)}:{os.path.getmtime(file_path)}"
+                cached_pixmap = QPixmapCache.find(self.image_cache_key)
+                if cached_pixmap is not None:
+                    print("Using cached image")
+                    self.show_image(cached_pixmap, None)
+                    return
+            
+            # Decode on a pool thread so large files do not freeze the window;
+            # image_loaded finishes the job on the GUI thread
+            worker = ImageLoadWorker(self.image_load_id, file_path)
+            worker.signals.loaded.connect(self.image_loaded)
+            self.image_load_signals = worker.signals  # Keep the signals alive until delivery
+            self.shape_count_label.setText("Loading image...")
+            QThreadPool.globalInstance().start(worker)
+
+    def image_loaded(self, load_id, image, geospatial_handler):
+        """Show an image decoded by ImageLoadWorker."""
+        if load_id != self.image_load_id:
+            print("Ignoring an image load superseded by a newer one")
+            return
+        
+        pixmap = QPixmap.fromImage(image)
+        if geospatial_handler is None and self.image_cache_key and not pixmap.isNull():
+            QPixmapCache.insert(self.image_cache_key, pixmap)
+        self.show_image(pixmap, geospatial_handler)
+
+    def show_image(self, pixmap, geospatial_handler):
+        """Put a loaded image in the scene and set up segmentation for it."""
+        self.pixmap = pixmap
+        self.geospatial_handler = geospatial_handler or GeospatialHandler()
+        if geospatial_handler is not None:
+            # Set GeoTIFF flag
+            self.is_geotiff_loaded = True
+            
+            # Debug CRS information
+            print(f"CRS type: {type(self.geospatial_handler.crs)}")
+            print(f"CRS string: {self.geospatial_handler.crs}")
+            print(f"Transform type: {type(self.geospatial_handler.transform)}")
+            print(f"Transform: {self.geospatial_handler.transform}")
+            print("GeoPackage export button enabled")
+            if self.geospatial_handler.custom_crs_created:
+                self.geospatial_handler.show_custom_crs_info(self)
+        
+        # Add image to scene
+        self.scene.addItem(MipmappedPixmapItem(self.pixmap))
+        # Let the GPU transform the image while panning and zooming when it
+        # fits in a texture
+        self.view.use_opengl_viewport(
+            max(self.pixmap.width(), self.pixmap.height()) <= OPENGL_MAX_IMAGE_SIZE
+        )
+        self.scene.setSceneRect(self.pixmap.rect().toRectF())
+        self.view.fitInView(self.scene.sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
+
+        # Enable buttons
+        self.set_image_tools_enabled(True)
+
+        self.initialize_segmentation_service()
+        self.update_shape_count()
+
+    def set_image_tools_enabled(self, enabled):
+        """Enable or disable the buttons that work on the loaded image."""
+        self.reset_button.setEnabled(enabled)
+        self.detectAllBtn.setEnabled(enabled)
+        self.clickDetectBtn.setEnabled(enabled)
+        self.brushFillBtn.setEnabled(enabled)
+        self.eraserBtn.setEnabled(enabled)
+        self.freeHandBtn.setEnabled(enabled)
+        self.editModeBtn.setEnabled(enabled)
+
+    def retire_segmentation_services(self):
+        """Detach the current image's segmentation services; results they still deliver are ignored."""
+        # A QThread must outlive its run(), so running services stay referenced
+        self.retired_services = [service for service in self.retired_services if service.isRunning()]
+        if self.segment_worker is not None:
+            # The previous image's embedding is no longer needed
+            self.segment_worker.cancel()
+            self.encode_pool.clear()
+            self.retired_services.append(self.segment_worker)
+        if self.mask_gen_service is not None:
+            self.retired_services.append(self.mask_gen_service)
+        self.segment_worker = None
+        self.mask_gen_service = None
 
     def initialize_segmentation_service(self):
         """Initialize the segmentation service and connect signals."""
         self.segment_worker = SegmentationFromPromptService(self.pixmap)
+        # Compute the image embedding while the user looks around the image;
+        # previews requested meanwhile are answered once it is ready
+        self.encode_pool.start(self.segment_worker.encode)
         
-        # Connect signals
-        self.segment_worker.progress_updated.connect(self.update_progress)
-        self.segment_worker.segmentation_complete.connect(self.handle_segmentation_complete)
+        # Connect signals. The worker emits these from its own thread, queue
+        # them explicitly so they always arrive in emission order
+        self.segment_worker.progress_updated.connect(self.update_progress, Qt.ConnectionType.QueuedConnection)
+        self.segment_worker.segmentation_complete.connect(self.handle_segmentation_complete, Qt.ConnectionType.QueuedConnection)
         self.segment_worker.segmentation_preview_complete.connect(self.handle_segmentation_preview_complete)
-        
-        # Connect scene signals
-        self.scene.segmentation_validation_requested.connect(self.validate_segmentation)
-        self.scene.segmentation_preview_requested.connect(self.preview_segmentation)
+        # The scene's validation and preview signals are connected once in __init__;
+        # connecting them here again would run the slots once more per loaded image
 
     def initialize_mask_generation_service(self):
         self.mask_gen_service = MaskGenerationService(self.pixmap)
-        self.mask_gen_service.progress_updated.connect(self.update_progress)
-        self.mask_gen_service.segmentation_complete.connect(self.handle_segmentation_complete)
+        self.mask_gen_service.progress_updated.connect(self.update_progress, Qt.ConnectionType.QueuedConnection)
+        self.mask_gen_service.segmentation_complete.connect(self.handle_segmentation_complete, Qt.ConnectionType.QueuedConnection)
 
     def validate_segmentation(self):
         if not self.preview_polygon:
@@ -418,12 +490,14 @@ class MainWindow(QMainWindow):
         else:
             print(f"Showing progress bar (value is {value})")
             self.progress_bar.setVisible(True)
-            
-        # Process events to ensure UI updates
-        QApplication.processEvents()
+        # No processEvents() here: progress arrives as queued events from the
+        # worker thread, and the bar repaints when control returns to the loop
 
     def handle_segmentation_complete(self, masks):
         print("handle_segmentation_complete called")
+        if self.sender() not in (self.segment_worker, self.mask_gen_service):
+            # Masks of a previously loaded image
+            return
         if masks is None:
             print("No masks received")
             return
@@ -471,9 +545,11 @@ class MainWindow(QMainWindow):
         self.progress_bar.setValue(0)
         self.progress_bar.setVisible(False)
         print("handle_segmentation_complete finished")
-        QApplication.processEvents()
 
     def handle_segmentation_preview_complete(self, mask):
+        if self.sender() is not self.segment_worker:
+            # A preview queued by the worker of a previously loaded image
+            return
         # Convert mask to polygon
         polygon = self.convert_mask_to_polygon(mask)
         if polygon:
@@ -668,8 +744,18 @@ class MainWindow(QMainWindow):
 
     def convert_mask_to_polygon(self, mask):
         """Convert a binary mask to a list of polygon points"""
-        mask_uint8 = mask.astype(np.uint8) * 255
-        contours, _ = cv2.findContours(mask_uint8, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_TC89_KCOS)
+        # findContours treats any non-zero pixel as foreground, so no rescaling is needed;
+        # a bool mask is reinterpreted as uint8 without a copy
+        mask_uint8 = mask.view(np.uint8) if mask.dtype == bool else mask.astype(np.uint8)
+        # SAM masks cover the whole image but an artifact only a small part of it:
+        # trace the contour inside the mask's bounding box and shift it back
+        x, y, width, height = cv2.boundingRect(mask_uint8)
+        contours = ()
+        if width and height:
+            contours, _ = cv2.findContours(
+                mask_uint8[y:y + height, x:x + width], cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_TC89_KCOS,
+                offset=(x, y)
+            )
         
         if not contours:
             print("convert_mask_to_polygon: No contours found")
@@ -680,10 +766,10 @@ class MainWindow(QMainWindow):
         epsilon = 0.0005 * cv2.arcLength(largest_contour, True)
         approx_contour = cv2.approxPolyDP(largest_contour, epsilon, True)
         
-        # Convert to QPolygonF
-        points = [QPointF(point[0][0], point[0][1]) for point in approx_contour]
-        print(f"convert_mask_to_polygon: {len(points)} points in polygon")
-        return QPolygonF(points)
+        # Convert the (N, 1, 2) contour array to QPolygonF in one copy
+        polygon = self.scene.array_to_qpolygonf(approx_contour.reshape(-1, 2))
+        print(f"convert_mask_to_polygon: {polygon.count()} points in polygon")
+        return polygon
 
     def create_polygon_item(self, polygon):
         print(f"create_polygon_item: polygon with {polygon.count()} points")
@@ -1114,6 +1200,7 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Export Error", str(e))
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
     app = QApplication(sys.argv)
     w = MainWindow()
     app.exec()
\ No newline at end of file
@@ -17,6 +17,7 @@ from PyQt6.QtWidgets import QGraphicsPolygonItem, QGraphicsTextItem, QInputDialo
 from PyQt6.QtCore import Qt, QPointF, QRectF
 from PyQt6.QtGui import QColor, QBrush, QPen, QPainter, QPainterPath, QFont, QFontMetrics, QPolygonF
 from shapely.geometry import Polygon as ShapelyPolygon, box
+import numpy as np
 
 class OutlinedTextItem(QGraphicsItem):
     """
@@ -145,8 +146,38 @@ class ArtifactPolygonItem(QGraphicsPolygonItem):
         super().__init__(polygon)
         self.text_attribute = ""
         self.text_item = None
+        self._shapely_cache = None  # Shapely version of polygon(), rebuilt after setPolygon
+        self._bounds_cache = None  # Vertex bounding box of polygon(), rebuilt after setPolygon
         self.update_text_position()
 
+    def setPolygon(self, polygon):
+        """Set the polygon and drop the cached Shapely geometry and bounds"""
+        self._shapely_cache = None
+        self._bounds_cache = None
+        super().setPolygon(polygon)
+
+    def shapely_polygon(self):
+        """Return the polygon (item coordinates) as a Shapely Polygon, cached until it changes"""
+        if self._shapely_cache is None:
+            polygon = self.polygon()
+            count = polygon.count()
+            if count == 0:
+                self._shapely_cache = ShapelyPolygon()
+            else:
+                # QPolygonF stores its points as consecutive (x, y) doubles
+                ptr = polygon.data()
+                ptr.setsize(count * 16)
+                coords = np.frombuffer(ptr, dtype=np.float64).reshape(count, 2).copy()
+                self._shapely_cache = ShapelyPolygon(coords)
+        return self._shapely_cache
+
+    def polygon_bounds(self):
+        """Return (min_x, min_y, max_x, max_y) of the polygon (item coordinates), cached until it changes"""
+        if self._bounds_cache is None:
+            rect = self.polygon().boundingRect()
+            self._bounds_cache = (rect.left(), rect.top(), rect.right(), rect.bottom())
+        return self._bounds_cache
+
     def set_text_attribute(self, text):
         self.text_attribute = text
         scene = self.scene()
@@ -13,9 +13,15 @@ class GeospatialHandler:
         self.transform = None
         self.crs = None
         self.dataset = None
+        # Set when the loaded GeoTIFF had no CRS, see show_custom_crs_info
+        self.custom_crs_created = False
 
     def load_geotiff(self, file_path, parent_widget=None):
-        """Load a GeoTIFF file and extract geographic metadata."""
+        """Load a GeoTIFF file and extract geographic metadata.
+
+        Without a parent_widget no dialog is shown, so the file can be read off the
+        GUI thread; call show_custom_crs_info from the GUI thread afterwards.
+        """
         try:
             print(f"Opening GeoTIFF with rasterio: {file_path}")
             
@@ -73,14 +79,9 @@ class GeospatialHandler:
                     print(f"Original transform stored for coordinate preservation")
                 
                 # Show info to user
-                try:
-                    from PyQt6.QtWidgets import QMessageBox
-                    QMessageBox.information(parent_widget, "Custom CRS Created", 
-                                          "No coordinate reference system (CRS) was found in the GeoTIFF file.\n"
-                                          "Created a custom coordinate system based on the original transform parameters.\n"
-                                          "The exported GeoPackage will maintain the original coordinate values from your GeoTIFF.")
-                except ImportError:
-                    print("PyQt6 not available, cannot show info dialog")
+                self.custom_crs_created = True
+                if parent_widget is not None:
+                    self.show_custom_crs_info(parent_widget)
             
             # Print metadata
             print("\nDataset Metadata:")
@@ -94,12 +95,11 @@ class GeospatialHandler:
             print(f"\nNumber of bands: {num_bands}")
             
             if num_bands >= 3:
-                # For color images, read all three bands
-                rgb_array = self.dataset.read([1, 2, 3])
-                # Transpose to get (height, width, channels) format
-                rgb_array = np.transpose(rgb_array, (1, 2, 0))
-                # Ensure array is contiguous and in the correct format
-                rgb_array = np.ascontiguousarray(rgb_array)
+                # For color images, read all three bands straight into a contiguous
+                # (height, width, channels) array; reading (bands, height, width)
+                # and transposing would hold the image twice
+                rgb_array = np.empty((self.dataset.height, self.dataset.width, 3), dtype=self.dataset.dtypes[0])
+                self.dataset.read([1, 2, 3], out=rgb_array.transpose(2, 0, 1))
                 print(f"Created RGB array with shape: {rgb_array.shape}")
                 return rgb_array
             else:
@@ -116,6 +116,17 @@ class GeospatialHandler:
                 self.dataset = None
             raise Exception(f"Error loading GeoTIFF: {str(e)}")
 
+    def show_custom_crs_info(self, parent_widget):
+        """Tell the user that the loaded GeoTIFF had no CRS."""
+        try:
+            from PyQt6.QtWidgets import QMessageBox
+            QMessageBox.information(parent_widget, "Custom CRS Created", 
+                                  "No coordinate reference system (CRS) was found in the GeoTIFF file.\n"
+                                  "Created a custom coordinate system based on the original transform parameters.\n"
+                                  "The exported GeoPackage will maintain the original coordinate values from your GeoTIFF.")
+        except ImportError:
+            print("PyQt6 not available, cannot show info dialog")
+
     def pixel_to_geo(self, pixel_x, pixel_y):
         """Convert pixel coordinates to geographic coordinates."""
         if self.transform is None:
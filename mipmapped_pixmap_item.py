@@ -0,0 +1,72 @@
+"""
+MipmappedPixmapItem module for drawing large background images.
+
+Painting a 10000x10000 pixmap into a zoomed out view resamples the full
+resolution source on every frame. This item precomputes smoothly downscaled
+copies at load time (1/2, 1/4, ...) and paints the one closest to the
+current zoom level instead.
+"""
+
+import math
+
+from PyQt6.QtWidgets import QGraphicsPixmapItem
+from PyQt6.QtCore import Qt, QRectF, QSizeF
+from PyQt6.QtGui import QPainter
+
+# Stop halving once a level's longest side would drop below this many pixels
+MIPMAP_MIN_SIZE = 1024
+
+
+def build_mipmap_levels(pixmap):
+    """Return [pixmap, pixmap / 2, pixmap / 4, ...] down to MIPMAP_MIN_SIZE."""
+    levels = [pixmap]
+    while not pixmap.isNull() and max(levels[-1].width(), levels[-1].height()) // 2 >= MIPMAP_MIN_SIZE:
+        previous = levels[-1]
+        # Each level is scaled from the previous one, which is both cheaper
+        # and smoother than jumping straight from the full resolution image
+        levels.append(previous.scaled(
+            max(1, previous.width() // 2),
+            max(1, previous.height() // 2),
+            Qt.AspectRatioMode.IgnoreAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+        ))
+    return levels
+
+
+class MipmappedPixmapItem(QGraphicsPixmapItem):
+    """
+    Pixmap item that paints a downscaled copy of its pixmap when zoomed out.
+
+    Attributes:
+        levels (list): The pixmap followed by its successively halved copies
+    """
+
+    def __init__(self, pixmap, parent=None):
+        super().__init__(parent)
+        self.levels = []
+        self.setPixmap(pixmap)
+
+    def setPixmap(self, pixmap):
+        super().setPixmap(pixmap)
+        self.levels = build_mipmap_levels(pixmap)
+
+    def level_for_scale(self, level_of_detail):
+        """Index of the smallest level that still has a pixel per device pixel."""
+        if level_of_detail >= 1 or level_of_detail <= 0:
+            return 0
+        return min(int(-math.log2(level_of_detail)), len(self.levels) - 1)
+
+    def paint(self, painter, option, widget=None):
+        index = self.level_for_scale(option.levelOfDetailFromTransform(painter.worldTransform()))
+        if index == 0:
+            super().paint(painter, option, widget)
+            return
+
+        # Same smoothing rule as QGraphicsPixmapItem, only with a smaller source
+        painter.setRenderHint(
+            QPainter.RenderHint.SmoothPixmapTransform,
+            self.transformationMode() == Qt.TransformationMode.SmoothTransformation
+        )
+        level = self.levels[index]
+        target = QRectF(self.offset(), QSizeF(self.pixmap().size()))
+        painter.drawPixmap(target, level, QRectF(level.rect()))
@@ -17,7 +17,8 @@ import sys
 try:
     from PyQt6.QtWidgets import QApplication
     from PyQt6.QtCore import Qt, QPointF
-    from PyQt6.QtGui import QPolygonF, QMouseEvent, QPainterPath, QPen, QColor, QBrush
+    from PyQt6.QtGui import QPolygonF, QMouseEvent, QPainterPath, QPen, QColor, QBrush, QImage, QPainter
+    import numpy as np
     from ArtifactGraphicsScene import ArtifactGraphicsScene
     from artifact_polygon_item import ArtifactPolygonItem
     from viewer_mode import ViewerMode
@@ -124,6 +125,81 @@ class TestEraserMode(unittest.TestCase):
         self.assertIsNone(self.scene.eraser_path)
         self.assertEqual(len(self.scene.eraser_points), 0)
 
+    def test_qpolygonf_array_round_trip(self):
+        """Test that QPolygonF <-> array conversion keeps vertices and leaves the source untouched."""
+        polygon = QPolygonF([QPointF(1.5, 2), QPointF(3, 4.25), QPointF(-5, 6)])
+
+        coords = self.scene.qpolygonf_to_array(polygon)
+        np.testing.assert_array_equal(coords, [[1.5, 2], [3, 4.25], [-5, 6]])
+        coords[0] = (100, 100)
+        self.assertEqual(polygon.at(0), QPointF(1.5, 2))
+
+        rebuilt = self.scene.array_to_qpolygonf(coords)
+        self.assertEqual(rebuilt.count(), 3)
+        self.assertEqual(rebuilt.at(0), QPointF(100, 100))
+        self.assertEqual(rebuilt.at(2), QPointF(-5, 6))
+        self.assertEqual(self.scene.qpolygonf_to_array(QPolygonF()).shape, (0, 2))
+
+    def test_points_in_polygon_matches_qt(self):
+        """Test that batch point-in-polygon agrees with QPolygonF.containsPoint."""
+        polygon = QPolygonF([
+            QPointF(100, 100), QPointF(300, 120), QPointF(200, 200),
+            QPointF(300, 300), QPointF(100, 280)
+        ])
+        rng = np.random.default_rng(0)
+        points = rng.uniform(50, 350, size=(500, 2)) + 0.5
+        result = self.scene.points_in_polygon(polygon, points)
+        expected = [polygon.containsPoint(QPointF(x, y), Qt.FillRule.OddEvenFill) for x, y in points]
+        self.assertEqual(result.tolist(), expected)
+        self.assertFalse(self.scene.points_in_polygon(QPolygonF(), points).any())
+
+    def test_shapely_polygon_cache_invalidated_by_set_polygon(self):
+        """Test that the cached Shapely polygon follows setPolygon."""
+        item = ArtifactPolygonItem(QPolygonF([QPointF(0, 0), QPointF(10, 0), QPointF(10, 10), QPointF(0, 10)]))
+
+        first = item.shapely_polygon()
+        self.assertAlmostEqual(first.area, 100)
+        self.assertIs(item.shapely_polygon(), first)
+
+        item.setPolygon(QPolygonF([QPointF(0, 0), QPointF(20, 0), QPointF(20, 20), QPointF(0, 20)]))
+        self.assertAlmostEqual(item.shapely_polygon().area, 400)
+
+    def test_polygon_bounds_cache_invalidated_by_set_polygon(self):
+        """Test that the cached polygon bounds follow setPolygon."""
+        item = ArtifactPolygonItem(QPolygonF([QPointF(1, 2), QPointF(10, 2), QPointF(10, 12)]))
+        self.assertEqual(item.polygon_bounds(), (1, 2, 10, 12))
+
+        item.setPolygon(QPolygonF([QPointF(-5, 0), QPointF(20, 0), QPointF(20, 30)]))
+        self.assertEqual(item.polygon_bounds(), (-5, 0, 20, 30))
+
+    def test_stop_erasing_finds_intersecting_polygons(self):
+        """Test that stopping erasing only modifies polygons touched by the eraser path."""
+        touched = ArtifactPolygonItem(QPolygonF([
+            QPointF(100, 100), QPointF(300, 100), QPointF(300, 300), QPointF(100, 300)
+        ]))
+        untouched = ArtifactPolygonItem(QPolygonF([
+            QPointF(400, 100), QPointF(600, 100), QPointF(600, 300), QPointF(400, 300)
+        ]))
+        crossed = ArtifactPolygonItem(QPolygonF([
+            QPointF(100, 400), QPointF(300, 400), QPointF(300, 600), QPointF(100, 600)
+        ]))
+        for item in (touched, untouched, crossed):
+            self.scene.addItem(item)
+
+        # Stroke with points inside the first polygon
+        self.scene.start_erasing(QPointF(150, 50))
+        self.scene.erase(QPointF(150, 200))
+        self.scene.erase(QPointF(160, 350))
+        # Single segment crossing the third polygon with no point inside it
+        self.scene.erase(QPointF(200, 350))
+        self.scene.erase(QPointF(200, 650))
+        self.scene.stop_erasing()
+
+        items = self.scene.items()
+        self.assertNotIn(touched, items)
+        self.assertNotIn(crossed, items)
+        self.assertIn(untouched, items)
+
     def test_smooth_eraser_path(self):
         """Test that eraser path smoothing works correctly."""
         # Add some points
@@ -143,6 +219,14 @@ class TestEraserMode(unittest.TestCase):
         self.assertEqual(len(smoothed), len(points))
         self.assertIsInstance(smoothed[0], QPointF)
 
+    def test_smooth_eraser_coords_moving_average(self):
+        """Test that smoothed coordinates are the edge-padded 3-point moving average."""
+        self.scene.eraser_points = [QPointF(0, 0), QPointF(3, 6), QPointF(6, 0), QPointF(9, 6)]
+
+        smoothed = self.scene.smooth_eraser_coords()
+
+        np.testing.assert_allclose(smoothed, [[1, 2], [3, 2], [6, 4], [8, 4]])
+
     def test_smooth_eraser_path_insufficient_points(self):
         """Test that smoothing handles insufficient points."""
         # Add only one point
@@ -221,6 +305,232 @@ class TestEraserMode(unittest.TestCase):
         self.assertIsInstance(qpolygon, QPolygonF)
         self.assertGreaterEqual(qpolygon.count(), 3)
 
+    def test_qimage_to_mask_array(self):
+        """Test conversion from a Grayscale8 QImage to a binary numpy mask."""
+        # Use an odd width so rows are padded in the QImage buffer
+        image = QImage(13, 7, QImage.Format.Format_Grayscale8)
+        image.fill(0)
+        image.setPixelColor(3, 2, QColor(255, 255, 255))
+        image.setPixelColor(12, 6, QColor(40, 40, 40))
+
+        mask = self.scene.qimage_to_mask_array(image)
+
+        self.assertEqual(mask.shape, (7, 13))
+        self.assertEqual(mask.dtype, np.uint8)
+        self.assertEqual(mask[2, 3], 1)
+        self.assertEqual(mask[6, 12], 1)
+        self.assertEqual(int(mask.sum()), 2)
+
+    def test_polygon_to_mask_array(self):
+        """Test rasterizing a QPolygonF into a numpy mask."""
+        polygon = QPolygonF([
+            QPointF(10, 10),
+            QPointF(30, 10),
+            QPointF(30, 20),
+            QPointF(10, 20)
+        ])
+
+        mask = self.scene.polygon_to_mask_array(polygon, 50, 40)
+
+        self.assertEqual(mask.shape, (40, 50))
+        self.assertEqual(mask[15, 20], 1)
+        self.assertEqual(mask[5, 5], 0)
+        # Boundary pixels are included, as with QPainter.drawPolygon
+        self.assertEqual(int(mask.sum()), 21 * 11)
+
+    def test_stroke_to_mask_array(self):
+        """Test rasterizing an eraser stroke into a numpy mask."""
+        points = [QPointF(10, 10), QPointF(40, 10), QPointF(0, 0), QPointF(20, 30)]
+
+        mask = self.scene.stroke_to_mask_array(points, 50, 40, 3)
+
+        self.assertEqual(mask.shape, (40, 50))
+        # The first segment is drawn with the requested width
+        self.assertEqual(mask[10, 25], 1)
+        self.assertEqual(mask[11, 25], 1)
+        self.assertEqual(mask[13, 25], 0)
+        # Segments touching the null point are skipped
+        self.assertEqual(mask[20, 10], 0)
+        self.assertEqual(mask[30, 20], 0)
+
+    def test_sample_points_from_mask(self):
+        """Test that set-based sampling handles thin regions and mask origins."""
+        mask = np.zeros((50, 50), dtype=bool)
+        mask[:, 25] = True  # One pixel wide strip
+
+        points = self.scene.sample_points_from_mask(mask, (100, 100, 149, 149), 32, origin=(100, 100))
+
+        self.assertEqual(len(points), 32)
+        self.assertEqual(len({(p.x(), p.y()) for p in points}), 32)
+        for point in points:
+            self.assertEqual(point.x(), 125)
+            self.assertTrue(100 <= point.y() < 149)
+
+        # A two-dimensional block at the default origin
+        block = np.zeros((100, 100), dtype=bool)
+        block[20:30, 40:60] = True
+        for point in self.scene.sample_points_from_mask(block, (0, 0, 99, 99), 32):
+            self.assertTrue(block[int(point.y()), int(point.x())])
+
+        self.assertEqual(self.scene.sample_points_from_mask(np.zeros((50, 50), dtype=bool), (0, 0, 49, 49), 8), [])
+
+    def test_eraser_points_array(self):
+        """Test that the eraser coordinate array follows the eraser points list."""
+        self.scene.start_erasing(QPointF(0, 0))
+        for i in range(1, 200):
+            self.scene.erase(QPointF(3 * i, 6 * i))
+
+        coords = self.scene.eraser_points_array()
+        self.assertEqual(coords.shape, (200, 2))
+        np.testing.assert_array_equal(coords[:, 0], 3 * np.arange(200))
+        np.testing.assert_array_equal(coords[:, 1], 6 * np.arange(200))
+
+        # Replacing the list directly rebuilds the array
+        self.scene.eraser_points = [QPointF(5, 6), QPointF(7, 8)]
+        np.testing.assert_array_equal(self.scene.eraser_points_array(), [[5, 6], [7, 8]])
+        self.scene.eraser_points = []
+        self.assertEqual(self.scene.eraser_points_array().shape, (0, 2))
+
+    def test_erase_drops_short_moves(self):
+        """Test that eraser moves shorter than a quarter brush size are not recorded."""
+        self.scene.start_erasing(QPointF(100, 100))  # brush size 10 -> minimum step 2.5
+        self.scene.erase(QPointF(101, 101))
+        self.scene.erase(QPointF(102, 100))
+        self.scene.erase(QPointF(103, 100))
+        self.scene.erase(QPointF(104, 101))
+        self.scene.erase(QPointF(106, 101))
+
+        self.assertEqual(self.scene.eraser_points, [QPointF(100, 100), QPointF(103, 100), QPointF(106, 101)])
+        self.assertEqual(self.scene.eraser_path.elementCount(), 3)
+
+    def test_add_shape_from_paint_path_maps_painted_outline(self):
+        """Test that the painted outline is emitted as prompt points mapped through the last item."""
+        item = ArtifactPolygonItem(QPolygonF([QPointF(0, 0), QPointF(5, 0), QPointF(5, 5)]))
+        item.setPos(7, 3)
+        self.scene.addItem(item)
+        path = QPainterPath()
+        path.addRect(20, 30, 4, 2)
+        self.scene.current_paint_path = path
+        emitted = []
+        self.scene.segmentation_from_paint_data_requested.connect(emitted.append)
+
+        self.scene.add_shape_from_paint_path()
+
+        self.assertEqual(len(emitted), 1)
+        points = sorted((p.x(), p.y()) for p in emitted[0])
+        # The outlined and filled 4x2 rectangle covers pixels 20..24 x 30..32
+        expected = sorted((x + 7, y + 3) for x in (20, 24) for y in (30, 32))
+        self.assertEqual(points, expected)
+
+    def test_add_shape_from_paint_path_bounds_long_outlines(self):
+        """Test that long paint outlines are sub-sampled without shrinking their bounding box."""
+        self.scene.addItem(ArtifactPolygonItem(QPolygonF([QPointF(0, 0), QPointF(5, 0), QPointF(5, 5)])))
+        path = QPainterPath()
+        path.moveTo(10, 10)
+        for i in range(1, 200):
+            path.lineTo(10 + 4 * i, 10 + (i % 2) * 600)
+        self.scene.current_paint_path = path
+        emitted = []
+        self.scene.segmentation_from_paint_data_requested.connect(emitted.append)
+
+        self.scene.add_shape_from_paint_path()
+
+        # Reference: every painted pixel of the stroke rendered over the whole scene
+        image = QImage(1000, 1000, QImage.Format.Format_Grayscale8)
+        image.fill(0)
+        painter = QPainter(image)
+        painter.setPen(QPen(Qt.GlobalColor.white))
+        painter.setBrush(QBrush(Qt.GlobalColor.white))
+        painter.drawPath(path)
+        painter.end()
+        painted = np.argwhere(self.scene.qimage_to_mask_array(image))[:, ::-1]
+
+        points = np.array([(p.x(), p.y()) for p in emitted[0]])
+        self.assertLessEqual(len(points), 1004)
+        np.testing.assert_array_equal(points.min(axis=0), painted.min(axis=0))
+        np.testing.assert_array_equal(points.max(axis=0), painted.max(axis=0))
+
+    def test_dilate_mask_matches_binary_dilation(self):
+        """Test that dilate_mask matches scipy's binary_dilation."""
+        from scipy import ndimage
+        mask = np.zeros((60, 80), dtype=np.uint8)
+        mask[10, 10] = 1
+        mask[30, 40:50] = 1
+        mask[59, 79] = 1
+
+        for iterations in (2, 9):
+            expected = ndimage.binary_dilation(mask, iterations=iterations)
+            np.testing.assert_array_equal(self.scene.dilate_mask(mask, iterations=iterations), expected)
+
+    def run_process_erased_region(self, polygon, eraser_points):
+        """Run process_erased_region and return the polygon item and the emitted requests."""
+        polygon_item = ArtifactPolygonItem(polygon)
+        self.scene.addItem(polygon_item)
+        self.scene.current_erasing_polygon = polygon_item
+        self.scene.eraser_points = eraser_points
+
+        emitted = []
+        self.scene.segmentation_with_points_requested.connect(
+            lambda item, fg, bg, mask, bbox: emitted.append((item, fg, bg, QImage(mask), bbox)))
+        self.scene.process_erased_region()
+        return polygon_item, emitted
+
+    def assert_valid_erase_request(self, foreground_points, background_points, mask_image, bounding_box, polygon):
+        """Check a request's scene-sized mask against its bounding box and prompt points."""
+        self.assertEqual((mask_image.width(), mask_image.height()), (1000, 1000))
+        mask = self.scene.qimage_to_mask_array(mask_image)
+        rows, cols = np.nonzero(mask)
+        self.assertGreater(len(rows), 0)
+        # The box is the mask's extent padded by 10 pixels
+        self.assertEqual(bounding_box, [int(cols.min()) - 10, int(rows.min()) - 10,
+                                        int(cols.max()) + 10, int(rows.max()) + 10])
+        self.assertTrue(foreground_points)
+        self.assertTrue(background_points)
+        for point in foreground_points:
+            self.assertEqual(mask[int(point.y()), int(point.x())], 1)
+        polygon_mask = self.scene.polygon_to_mask_array(polygon, 1000, 1000)
+        for point in background_points:
+            self.assertEqual(mask[int(point.y()), int(point.x())], 0)
+            self.assertEqual(polygon_mask[int(point.y()), int(point.x())], 1)
+        return mask
+
+    def test_process_erased_region_without_split(self):
+        """Test that trimming a polygon's edge requests one segmentation of the rest."""
+        polygon = QPolygonF([QPointF(100, 100), QPointF(300, 100), QPointF(300, 300), QPointF(100, 300)])
+        polygon_item, emitted = self.run_process_erased_region(
+            polygon, [QPointF(290, 90), QPointF(290, 200), QPointF(290, 310)])
+
+        self.assertEqual(len(emitted), 1)
+        item, foreground_points, background_points, mask_image, bounding_box = emitted[0]
+        self.assertIs(item, polygon_item)
+        mask = self.assert_valid_erase_request(
+            foreground_points, background_points, mask_image, bounding_box, polygon)
+        # The remaining area stays inside the polygon and left of the stroke
+        self.assertEqual(bounding_box[:2], [90, 90])
+        self.assertLess(bounding_box[2], 290)
+        self.assertEqual(int(mask[:, 280:].sum()), 0)
+        self.assertNotIn(polygon_item, self.scene.items())
+        self.assertIsNone(self.scene.current_erasing_polygon)
+
+    def test_process_erased_region_with_split(self):
+        """Test that cutting a polygon in two requests one segmentation per piece."""
+        polygon = QPolygonF([QPointF(100, 100), QPointF(300, 100), QPointF(300, 200), QPointF(100, 200)])
+        polygon_item, emitted = self.run_process_erased_region(
+            polygon, [QPointF(200, 90), QPointF(200, 150), QPointF(200, 210)])
+
+        self.assertEqual(len(emitted), 2)
+        # Only the first piece's request carries the original polygon
+        self.assertIs(emitted[0][0], polygon_item)
+        self.assertIsNone(emitted[1][0])
+        masks = [self.assert_valid_erase_request(fg, bg, mask_image, bbox, polygon)
+                 for _, fg, bg, mask_image, bbox in emitted]
+        # Each piece lies on its own side of the stroke
+        pieces = sorted(masks, key=lambda mask: np.nonzero(mask)[1].min())
+        self.assertEqual(int(pieces[0][:, 190:].sum()), 0)
+        self.assertEqual(int(pieces[1][:, :211].sum()), 0)
+        self.assertFalse(np.any(pieces[0] & pieces[1]))
+        self.assertNotIn(polygon_item, self.scene.items())
+
     def test_process_manual_erasing_complete_erase(self):
         """Test that erasing completely removes a small polygon."""
         # Create a small polygon
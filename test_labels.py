@@ -16,8 +16,8 @@ import sys
 
 try:
     from PyQt6.QtWidgets import QApplication, QGraphicsView
-    from PyQt6.QtCore import Qt, QPointF, QRectF
-    from PyQt6.QtGui import QPolygonF, QPen, QColor, QBrush
+    from PyQt6.QtCore import Qt, QEvent, QPoint, QPointF, QRectF
+    from PyQt6.QtGui import QPolygonF, QPen, QColor, QBrush, QMouseEvent
     from ArtifactGraphicsScene import ArtifactGraphicsScene
     from artifact_polygon_item import ArtifactPolygonItem, OutlinedTextItem
     from ZoomableGraphicsView import ZoomableGraphicsView
@@ -170,6 +170,63 @@ class TestLabelFunctionality(unittest.TestCase):
                 if polygon_item.text_item:
                     self.assertTrue(polygon_item.text_item.isVisible())
 
+    def test_view_coalesces_label_updates(self):
+        """Test that a burst of zoom steps triggers a single label refresh."""
+        with patch.object(self.scene, 'update_label_visibility') as update:
+            for _ in range(5):
+                self.view.zoom_in()
+            self.view.scrollContentsBy(0, 10)
+            # Nothing runs until the timer fires
+            update.assert_not_called()
+            self.assertTrue(self.view.label_update_timer.isActive())
+            
+            self.view.label_update_timer.timeout.emit()
+            update.assert_called_once()
+
+    def test_view_zoom_keeps_anchor_point(self):
+        """Test that zooming keeps the scene point under the anchor in place."""
+        self.view.resize(400, 300)
+        self.view.fitInView(self.scene.sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
+        anchor = QPoint(100, 80)
+        before = self.view.mapToScene(anchor)
+        for _ in range(5):
+            self.view.zoom_at(self.view.zoom_factor, anchor)
+        after = self.view.mapToScene(anchor)
+        # Scroll bars move in whole pixels, so allow a pixel of drift
+        self.assertAlmostEqual(after.x(), before.x(), delta=2)
+        self.assertAlmostEqual(after.y(), before.y(), delta=2)
+
+    def test_view_middle_button_pans(self):
+        """Test that dragging with the middle button scrolls the view."""
+        self.view.resize(400, 300)
+        self.view.scale(2, 2)
+        hbar, vbar = self.view.horizontalScrollBar(), self.view.verticalScrollBar()
+        hbar.setValue(500)
+        vbar.setValue(500)
+
+        def mouse_event(event_type, pos, button, buttons):
+            return QMouseEvent(event_type, pos, self.view.viewport().mapToGlobal(pos),
+                               button, buttons, Qt.KeyboardModifier.NoModifier)
+
+        middle = Qt.MouseButton.MiddleButton
+        self.view.mousePressEvent(mouse_event(QEvent.Type.MouseButtonPress, QPointF(100, 100), middle, middle))
+        self.view.mouseMoveEvent(mouse_event(QEvent.Type.MouseMove, QPointF(130, 90), Qt.MouseButton.NoButton, middle))
+        self.view.mouseMoveEvent(mouse_event(QEvent.Type.MouseMove, QPointF(140, 70), Qt.MouseButton.NoButton, middle))
+        self.view.mouseReleaseEvent(mouse_event(QEvent.Type.MouseButtonRelease, QPointF(140, 70), middle, Qt.MouseButton.NoButton))
+        self.assertEqual((hbar.value(), vbar.value()), (460, 530))
+        self.assertFalse(self.view.pan_active)
+
+        # Moves after the release no longer pan
+        self.view.mouseMoveEvent(mouse_event(QEvent.Type.MouseMove, QPointF(10, 10), Qt.MouseButton.NoButton, Qt.MouseButton.NoButton))
+        self.assertEqual((hbar.value(), vbar.value()), (460, 530))
+
+    def test_view_opengl_viewport_falls_back_to_raster(self):
+        """Test that the view keeps a working raster viewport without OpenGL."""
+        with patch('ZoomableGraphicsView.opengl_available', return_value=False):
+            self.assertFalse(self.view.use_opengl_viewport(True))
+        self.assertEqual(type(self.view.viewport()).__name__, 'QWidget')
+        self.assertTrue(self.view.viewport().testAttribute(Qt.WidgetAttribute.WA_AcceptTouchEvents))
+
     def test_label_text_outline(self):
         """Test that labels use outlined text style."""
         polygon_item = ArtifactPolygonItem(self.test_polygon)
@@ -0,0 +1,88 @@
+"""
+Unit tests for MipmappedPixmapItem.
+
+This module tests that large background pixmaps get downscaled levels and
+that the item paints the level matching the current zoom.
+
+Requirements:
+    - PyQt6 must be installed (included in requirements.txt)
+    - Run tests from the project root directory with: python -m unittest test_mipmapped_pixmap_item.py
+"""
+
+import unittest
+import sys
+
+try:
+    from PyQt6.QtWidgets import QApplication, QGraphicsScene
+    from PyQt6.QtCore import QRectF
+    from PyQt6.QtGui import QPixmap, QImage, QPainter, QColor
+    from mipmapped_pixmap_item import MipmappedPixmapItem, MIPMAP_MIN_SIZE
+
+    # Initialize QApplication if it doesn't exist (required for PyQt6 widgets)
+    if not QApplication.instance():
+        app = QApplication(sys.argv)
+except ImportError as e:
+    print(f"Error importing dependencies: {e}")
+    print("Please install dependencies: pip install -r requirements.txt")
+    sys.exit(1)
+
+
+class TestMipmappedPixmapItem(unittest.TestCase):
+    """Test cases for the mipmapped background pixmap."""
+
+    def make_pixmap(self, width, height, color=QColor(200, 40, 10)):
+        pixmap = QPixmap(width, height)
+        pixmap.fill(color)
+        return pixmap
+
+    def test_small_pixmap_has_single_level(self):
+        """Test that images below the minimum size are not downscaled."""
+        item = MipmappedPixmapItem(self.make_pixmap(MIPMAP_MIN_SIZE + 10, 300))
+        self.assertEqual(len(item.levels), 1)
+
+    def test_levels_halve_down_to_minimum_size(self):
+        """Test that each level is half the size of the previous one."""
+        item = MipmappedPixmapItem(self.make_pixmap(MIPMAP_MIN_SIZE * 4 + 1, MIPMAP_MIN_SIZE))
+        sizes = [(level.width(), level.height()) for level in item.levels]
+        self.assertEqual(sizes, [
+            (MIPMAP_MIN_SIZE * 4 + 1, MIPMAP_MIN_SIZE),
+            (MIPMAP_MIN_SIZE * 2, MIPMAP_MIN_SIZE // 2),
+            (MIPMAP_MIN_SIZE, MIPMAP_MIN_SIZE // 4),
+        ])
+
+    def test_set_pixmap_rebuilds_levels(self):
+        """Test that replacing the pixmap replaces its levels."""
+        item = MipmappedPixmapItem(self.make_pixmap(MIPMAP_MIN_SIZE * 2, 10))
+        self.assertEqual(len(item.levels), 2)
+        item.setPixmap(self.make_pixmap(10, 10))
+        self.assertEqual(len(item.levels), 1)
+
+    def test_level_for_scale(self):
+        """Test that the level follows the zoom and is clamped to the coarsest one."""
+        item = MipmappedPixmapItem(self.make_pixmap(MIPMAP_MIN_SIZE * 4, MIPMAP_MIN_SIZE * 4))
+        self.assertEqual(item.level_for_scale(2.0), 0)
+        self.assertEqual(item.level_for_scale(0.75), 0)
+        self.assertEqual(item.level_for_scale(0.5), 1)
+        self.assertEqual(item.level_for_scale(0.3), 1)
+        self.assertEqual(item.level_for_scale(0.25), 2)
+        self.assertEqual(item.level_for_scale(0.01), 2)
+
+    def test_zoomed_out_render_covers_item(self):
+        """Test that a downscaled level is drawn over the full item bounds."""
+        scene = QGraphicsScene()
+        item = MipmappedPixmapItem(self.make_pixmap(MIPMAP_MIN_SIZE * 4, MIPMAP_MIN_SIZE * 4))
+        scene.addItem(item)
+        self.assertEqual(item.level_for_scale(0.25), 2)
+
+        image = QImage(MIPMAP_MIN_SIZE, MIPMAP_MIN_SIZE, QImage.Format.Format_RGB32)
+        image.fill(QColor(0, 0, 0))
+        painter = QPainter(image)
+        scene.render(painter, QRectF(image.rect()), item.boundingRect())
+        painter.end()
+
+        for x, y in [(0, 0), (MIPMAP_MIN_SIZE - 1, MIPMAP_MIN_SIZE - 1), (MIPMAP_MIN_SIZE // 2, 3)]:
+            self.assertEqual(image.pixelColor(x, y), QColor(200, 40, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+"""
+Unit tests for the segmentation services.
+
+This module tests that MaskGenerationService loads its model on its own
+thread, that the image embedding is computed by encode(), that
+previews requested before it is ready are deferred, that a cancelled encode
+is skipped, and that predictor calls from several threads never overlap.
+SAM is replaced by a fake SegmentationHelper module, so torch is not needed.
+
+Requirements:
+    - PyQt6 must be installed (included in requirements.txt)
+    - Run tests from the project root directory with: python -m unittest test_segmentation_worker.py
+"""
+
+import unittest
+from unittest.mock import patch
+import sys
+import threading
+import time
+import types
+
+try:
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtGui import QPixmap, QColor
+    import numpy as np
+
+    # Initialize QApplication if it doesn't exist (required for QPixmap)
+    if not QApplication.instance():
+        app = QApplication(sys.argv)
+except ImportError as e:
+    print(f"Error importing dependencies: {e}")
+    print("Please install dependencies: pip install -r requirements.txt")
+    sys.exit(1)
+
+
+class FakeSegmentationHelper:
+    """Stand-in for SegmentationHelper that records calls and checks they never overlap."""
+
+    instances = []
+
+    def __init__(self, model_type="vit_h"):
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.counter_lock = threading.Lock()
+        FakeSegmentationHelper.instances.append(self)
+
+    def track(self, name, *args):
+        with self.counter_lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.calls.append((name,) + args)
+        # Give other threads the chance to enter at the same time
+        time.sleep(0.01)
+        with self.counter_lock:
+            self.active -= 1
+
+    def load_image(self, image):
+        self.track("load_image", image.shape)
+
+    def generate_masks_from_point(self, point, progress_callback=None):
+        self.track("generate_masks_from_point", point)
+        return [np.zeros((8, 8), dtype=bool)]
+
+    def generate_all_masks(self, progress_callback=None):
+        self.track("generate_all_masks", self.image.shape)
+        return []
+
+
+def import_segmentation_worker():
+    """Import SegmentationWorker against the fake SegmentationHelper module."""
+    fake_module = types.ModuleType("SegmentationHelper")
+    fake_module.SegmentationHelper = FakeSegmentationHelper
+    fake_module.INTERACTIVE_MODEL_TYPE = "vit_b"
+    with patch.dict(sys.modules, {"SegmentationHelper": fake_module}):
+        sys.modules.pop("SegmentationWorker", None)
+        import SegmentationWorker
+    return SegmentationWorker
+
+
+SegmentationWorker = import_segmentation_worker()
+MaskGenerationService = SegmentationWorker.MaskGenerationService
+SegmentationFromPromptService = SegmentationWorker.SegmentationFromPromptService
+
+
+class TestMaskGenerationService(unittest.TestCase):
+    """Test cases for the detect-all service."""
+
+    def test_model_is_loaded_by_run(self):
+        """Test that the helper is created in run(), not on the GUI thread in the constructor."""
+        FakeSegmentationHelper.instances = []
+        pixmap = QPixmap(8, 8)
+        pixmap.fill(QColor(10, 20, 30))
+        service = MaskGenerationService(pixmap)
+        self.assertIsNone(service.segmentation_helper)
+        self.assertEqual(FakeSegmentationHelper.instances, [])
+
+        service.run()
+
+        self.assertEqual(len(FakeSegmentationHelper.instances), 1)
+        self.assertEqual(service.segmentation_helper.calls, [("generate_all_masks", (8, 8, 3))])
+
+
+class TestSegmentationFromPromptService(unittest.TestCase):
+    """Test cases for encoding and previewing in the prompt segmentation service."""
+
+    def setUp(self):
+        FakeSegmentationHelper.instances = []
+        pixmap = QPixmap(8, 8)
+        pixmap.fill(QColor(10, 20, 30))
+        self.service = SegmentationFromPromptService(pixmap)
+        self.previews = []
+        self.service.segmentation_preview_complete.connect(self.previews.append)
+
+    def test_constructor_does_not_load_model(self):
+        """Test that the model is only loaded by encode()."""
+        self.assertIsNone(self.service.segmentation_helper)
+        self.assertFalse(self.service.is_ready())
+        self.service.encode()
+        self.assertTrue(self.service.is_ready())
+        self.assertEqual(self.service.segmentation_helper.calls, [("load_image", (8, 8, 3))])
+
+    def test_preview_before_encode_is_deferred(self):
+        """Test that only the latest early preview runs, once the embedding is ready."""
+        self.service.preview_segmentation((1, 1))
+        self.service.preview_segmentation((2, 2))
+        self.assertEqual(FakeSegmentationHelper.instances, [])
+        self.assertEqual(self.previews, [])
+
+        self.service.encode()
+
+        self.assertEqual(self.service.segmentation_helper.calls, [
+            ("load_image", (8, 8, 3)),
+            ("generate_masks_from_point", (2, 2)),
+        ])
+        self.assertEqual(len(self.previews), 1)
+        self.assertIsNone(self.service.pending_preview_prompt)
+
+    def test_cancelled_encode_is_skipped(self):
+        """Test that an encode queued for a replaced image does no work."""
+        self.service.preview_segmentation((1, 1))
+        self.service.cancel()
+        self.service.encode()
+        self.assertEqual(FakeSegmentationHelper.instances, [])
+        self.assertFalse(self.service.is_ready())
+        self.assertEqual(self.previews, [])
+
+    def test_predictor_calls_do_not_overlap(self):
+        """Test that encode, run() and previews from several threads use the predictor one at a time."""
+        self.service.preview_segmentation((0, 0))
+        self.service.point_prompt = (3, 3)
+        threads = [threading.Thread(target=self.service.encode), threading.Thread(target=self.service.run)]
+        threads += [
+            threading.Thread(target=self.service.preview_segmentation, args=((i, i),))
+            for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(FakeSegmentationHelper.instances), 1)
+        helper = FakeSegmentationHelper.instances[0]
+        self.assertEqual(helper.max_active, 1)
+        # The embedding is computed once, before any mask is generated
+        self.assertEqual([call[0] for call in helper.calls].count("load_image"), 1)
+        self.assertEqual(helper.calls[0][0], "load_image")
+        self.assertIn(("generate_masks_from_point", (3, 3)), helper.calls)
+
+
+if __name__ == '__main__':
+    unittest.main()